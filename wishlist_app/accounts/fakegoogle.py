@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+
+class FakeGoogleServer:
+    """
+    Local stand-in for Google's OAuth token endpoint and JWKS endpoint.
+
+    ``POST /token`` returns an id_token for ``email``, signed with a freshly
+    generated RSA key, and ``GET /certs`` publishes that key. Point
+    ``GOOGLE_TOKEN_URL`` / ``GOOGLE_JWKS_URL`` at ``token_url`` / ``jwks_url``
+    in tests.
+
+    Usage:
+        with FakeGoogleServer(client_id='test-client') as google:
+            google.token_url
+    """
+    issuer = 'https://accounts.google.com'
+    kid = 'fake-key-1'
+
+    def __init__(self, client_id, email='oauth@example.com', name='OAuth User'):
+        self.client_id = client_id
+        self.email = email
+        self.name = name
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.jwks_requests = 0
+        self.token_requests = 0
+        self._server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def token_url(self):
+        return f"{self.base_url}/token"
+
+    @property
+    def jwks_url(self):
+        return f"{self.base_url}/certs"
+
+    def make_id_token(self, **overrides):
+        """Return a signed id_token; claims can be overridden."""
+        now = int(time.time())
+        claims = {
+            'iss': self.issuer,
+            'aud': self.client_id,
+            'sub': '1234567890',
+            'email': self.email,
+            'email_verified': True,
+            'name': self.name,
+            'iat': now,
+            'exp': now + 3600,
+            **overrides,
+        }
+        return jwt.encode(claims, self.private_key, algorithm='RS256', headers={'kid': self.kid})
+
+    def jwks(self):
+        jwk = json.loads(RSAAlgorithm.to_jwk(self.private_key.public_key()))
+        jwk.update({'kid': self.kid, 'alg': 'RS256', 'use': 'sig'})
+        return {'keys': [jwk]}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send_json(self, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == '/certs':
+                    server.jwks_requests += 1
+                    self._send_json(server.jwks())
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.path == '/token':
+                    server.token_requests += 1
+                    self._send_json({
+                        'access_token': 'fake-access-token',
+                        'id_token': server.make_id_token(),
+                        'token_type': 'Bearer',
+                        'expires_in': 3600,
+                    })
+                else:
+                    self.send_error(404)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from wishlist_app.images import NormalizedImagesMixin
 from .models import CustomUser, UserProfile, Interest
 
 class RegisterForm(UserCreationForm):
@@ -26,11 +27,14 @@ class EmailLoginForm(AuthenticationForm):
     password = forms.CharField(label="Password", strip=False, widget=forms.PasswordInput)
     
 
-class UserProfileForm(forms.ModelForm):
+class UserProfileForm(NormalizedImagesMixin, forms.ModelForm):
     """
     Form for creating or editing a user's profile.
     Handles bio, profile picture, and social media handles.
+    The uploaded profile picture is normalized (downscaled, metadata stripped).
     """
+    normalized_image_fields = ('profile_pic',)
+
     class Meta:
         model = UserProfile
         fields = ['bio', 'profile_pic', 'facebook', 'twitter', 'instagram']
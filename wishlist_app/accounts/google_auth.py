@@ -0,0 +1,117 @@
+import threading
+import time
+
+import jwt
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from wishlist_app.metrics import record_http
+
+# One pooled session for all calls to Google, so logins reuse TLS connections.
+session = requests.Session()
+session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+
+class InvalidIdToken(Exception):
+    """Raised when an id_token cannot be verified."""
+
+
+class JWKSCache:
+    """
+    In-process cache of the identity provider's signing keys.
+
+    Keys are fetched from ``GOOGLE_JWKS_URL`` and kept for
+    ``GOOGLE_JWKS_TTL`` seconds. An unknown ``kid`` triggers an early refresh
+    (at most once per ``min_refresh_interval`` seconds) to pick up key rotation.
+    """
+    min_refresh_interval = 60
+
+    def __init__(self):
+        self._keys = {}
+        self._fetched_at = None  # monotonic time of the last fetch; None = never
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._keys = {}
+            self._fetched_at = None
+
+    def _refresh(self):
+        with record_http():
+            resp = session.get(settings.GOOGLE_JWKS_URL, timeout=settings.GOOGLE_HTTP_TIMEOUT)
+        resp.raise_for_status()
+        self._keys = {
+            jwk['kid']: jwt.PyJWK(jwk).key
+            for jwk in resp.json().get('keys', [])
+            if 'kid' in jwk
+        }
+        self._fetched_at = time.monotonic()
+
+    def get_key(self, kid):
+        """
+        Return the public key for ``kid``, refreshing the cache if needed.
+        Raises:
+            InvalidIdToken: If no key with this id is published.
+        """
+        with self._lock:
+            age = None if self._fetched_at is None else time.monotonic() - self._fetched_at
+            if (age is None or age > settings.GOOGLE_JWKS_TTL
+                    or (kid not in self._keys and age > self.min_refresh_interval)):
+                self._refresh()
+            try:
+                return self._keys[kid]
+            except KeyError:
+                raise InvalidIdToken(f"Unknown signing key: {kid}")
+
+
+jwks_cache = JWKSCache()
+
+
+def exchange_code(code):
+    """
+    Exchange an authorization code for tokens.
+    Args:
+        code (str): Authorization code returned by Google.
+    Returns:
+        dict: Token endpoint response (contains 'id_token').
+    """
+    with record_http():
+        resp = session.post(
+            settings.GOOGLE_TOKEN_URL,
+            data={
+                "code": code,
+                "client_id": settings.GOOGLE_CLIENT_ID,
+                "client_secret": settings.GOOGLE_CLIENT_SECRET,
+                "redirect_uri": settings.GOOGLE_REDIRECT_URI,
+                "grant_type": "authorization_code",
+            },
+            timeout=settings.GOOGLE_HTTP_TIMEOUT,
+        )
+    return resp.json()
+
+
+def verify_id_token(id_token):
+    """
+    Verify an id_token locally against the cached signing keys.
+    Checks signature, audience, issuer and expiry.
+    Args:
+        id_token (str): Encoded JWT.
+    Returns:
+        dict: Verified token claims.
+    Raises:
+        InvalidIdToken: If the token is malformed, forged or expired.
+    """
+    try:
+        header = jwt.get_unverified_header(id_token)
+        key = jwks_cache.get_key(header.get('kid'))
+        return jwt.decode(
+            id_token,
+            key,
+            algorithms=['RS256'],
+            audience=settings.GOOGLE_CLIENT_ID,
+            issuer=settings.GOOGLE_ISSUERS,
+        )
+    except jwt.PyJWTError as e:
+        raise InvalidIdToken(str(e)) from e
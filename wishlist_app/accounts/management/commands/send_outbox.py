@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.outbox import send_pending_emails
+
+
+class Command(BaseCommand):
+    """
+    Deliver queued emails from the OutboxEmail table.
+
+    Without --loop, drains everything that is currently due and exits
+    (suitable for cron). With --loop, keeps polling every --interval seconds.
+    """
+    help = "Send pending outbox emails in batches over a reused SMTP connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help="Keep running and poll for new emails.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Polling interval in seconds for --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = send_pending_emails(options['batch_size'], options['max_attempts'])
+                total_sent += sent
+                total_failed += failed
+                if sent + failed < options['batch_size']:
+                    break
+            if total_sent or total_failed or not options['loop']:
+                self.stdout.write(f"Sent {total_sent} email(s), {total_failed} failed attempt(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -1,6 +1,8 @@
 from django.db import models
+from django.db.models.functions import ExtractDay, ExtractMonth
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
 
 import os
 import uuid
@@ -25,6 +27,15 @@ class CustomUser(AbstractUser):
     USERNAME_FIELD = 'email'        
     REQUIRED_FIELDS = []           
 
+    class Meta:
+        indexes = [
+            # Birthday as month * 100 + day, so "birthdays in the next N days" is an index range scan.
+            models.Index(
+                ExtractMonth('date_of_birth') * 100 + ExtractDay('date_of_birth'),
+                name='user_birthday_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.email
 
@@ -80,10 +91,69 @@ class UserProfile(models.Model):
     bio = models.TextField(null=True, blank=True)
     likes = models.ManyToManyField(Interest, related_name='likes', blank=True)
     dislikes = models.ManyToManyField(Interest, related_name='dislikes', blank=True)
-    profile_pic = models.ImageField(upload_to=path_and_rename, null=True, blank=True)
+    profile_pic = models.ImageField(upload_to=path_and_rename, null=True, blank=True, db_index=True)
     facebook = models.CharField(max_length=50, null=True, blank=True)
     twitter = models.CharField(max_length=50, null=True, blank=True)
     instagram = models.CharField(max_length=50, null=True, blank=True)
     
     def __str__(self):
         return str(self.user)
+
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be delivered by the ``send_outbox`` command.
+    Views enqueue messages here instead of talking to SMTP during the request.
+    Fields:
+        subject, body: Message content
+        content_subtype: 'plain' or 'html'
+        from_email: Sender address
+        to: Recipient address
+        status: pending, sent or failed
+        attempts: Number of delivery attempts made so far
+        next_attempt_at: Earliest time of the next attempt (used for backoff)
+        last_error: Error message of the last failed attempt
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    content_subtype = models.CharField(max_length=10, default='plain')
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    @classmethod
+    def enqueue(cls, subject, body, to, from_email=None, content_subtype='plain'):
+        """
+        Queue an email for background delivery.
+        Returns:
+            OutboxEmail: The created outbox row.
+        """
+        return cls.objects.create(
+            subject=subject,
+            body=body,
+            to=to,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            content_subtype=content_subtype,
+        )
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+def retry_delay(attempts):
+    """
+    Exponential backoff between delivery attempts.
+    Args:
+        attempts (int): Number of attempts made so far.
+    Returns:
+        timedelta: Delay before the next attempt.
+    """
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_BASE_SECONDS', 30)
+    cap = getattr(settings, 'EMAIL_OUTBOX_RETRY_MAX_SECONDS', 3600)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def send_pending_emails(batch_size=50, max_attempts=None):
+    """
+    Deliver one batch of due outbox emails over a single SMTP connection.
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    workers can drain the outbox at the same time. Failed messages are
+    rescheduled with exponential backoff and marked failed after
+    ``max_attempts`` attempts.
+    Args:
+        batch_size (int): Maximum number of messages to send.
+        max_attempts (int): Attempts before giving up on a message.
+    Returns:
+        tuple: (sent, failed) counts for this batch.
+    """
+    if max_attempts is None:
+        max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    sent = failed = 0
+
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at', 'pk')[:batch_size]
+        )
+        if not batch:
+            return sent, failed
+
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            for outbox_email in batch:
+                _mark_failed(outbox_email, e, max_attempts)
+            return sent, len(batch)
+
+        try:
+            for outbox_email in batch:
+                message = EmailMessage(
+                    outbox_email.subject,
+                    outbox_email.body,
+                    outbox_email.from_email,
+                    [outbox_email.to],
+                    connection=connection,
+                )
+                message.content_subtype = outbox_email.content_subtype
+                try:
+                    message.send(fail_silently=False)
+                except Exception as e:
+                    _mark_failed(outbox_email, e, max_attempts)
+                    failed += 1
+                else:
+                    outbox_email.status = OutboxEmail.SENT
+                    outbox_email.attempts += 1
+                    outbox_email.sent_at = timezone.now()
+                    outbox_email.last_error = ''
+                    outbox_email.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+                    sent += 1
+        finally:
+            connection.close()
+
+    return sent, failed
+
+
+def _mark_failed(outbox_email, error, max_attempts):
+    outbox_email.attempts += 1
+    outbox_email.last_error = str(error)
+    if outbox_email.attempts >= max_attempts:
+        outbox_email.status = OutboxEmail.FAILED
+    else:
+        outbox_email.next_attempt_at = timezone.now() + retry_delay(outbox_email.attempts)
+    outbox_email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
@@ -1,6 +1,16 @@
-from django.test import TestCase, Client
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
-from .models import CustomUser, UserProfile, Interest
+from django.utils import timezone
+from .fakegoogle import FakeGoogleServer
+from .google_auth import jwks_cache
+from .models import CustomUser, UserProfile, Interest, OutboxEmail
+from .outbox import send_pending_emails
+from .views import gerenate_google_oauth_redirect_url
 
 class AccountsModelTests(TestCase):
     def setUp(self):
@@ -126,4 +136,136 @@ class AccountsViewPOSTTests(TestCase):
         self.assertIn(self.dislike, profile.dislikes.all())
         self.assertTrue(profile.likes.filter(name='🎁 Tennis').exists())
         self.assertTrue(profile.dislikes.filter(name='🚫 Cabbage').exists())
-        self.assertEqual(profile.bio, 'Updated bio')
\ No newline at end of file
+        self.assertEqual(profile.bio, 'Updated bio')
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxTests(TestCase):
+    def test_register_enqueues_activation_email(self):
+        response = self.client.post(reverse('accounts:register'), {
+            'username': 'newuser',
+            'email': 'new@example.com',
+            'password1': 'Str0ng-pass-123',
+            'password2': 'Str0ng-pass-123',
+        })
+        self.assertTemplateUsed(response, 'accounts/registration_pending.html')
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboxEmail.objects.get()
+        self.assertEqual(queued.to, 'new@example.com')
+        self.assertEqual(queued.content_subtype, 'html')
+
+    def test_send_outbox_command_delivers_batch(self):
+        for i in range(3):
+            OutboxEmail.enqueue('Hello', '<p>Hi</p>', f'user{i}@example.com', content_subtype='html')
+
+        out = StringIO()
+        call_command('send_outbox', '--batch-size', '2', stdout=out)
+
+        self.assertIn('Sent 3 email(s)', out.getvalue())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].content_subtype, 'html')
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists())
+
+    def test_failed_send_is_retried_with_backoff(self):
+        queued = OutboxEmail.enqueue('Hello', 'Hi', 'user@example.com')
+
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError('SMTP down')):
+            sent, failed = send_pending_emails(max_attempts=2)
+        queued.refresh_from_db()
+        self.assertEqual((sent, failed), (0, 1))
+        self.assertEqual(queued.status, OutboxEmail.PENDING)
+        self.assertEqual(queued.last_error, 'SMTP down')
+        self.assertGreater(queued.next_attempt_at, timezone.now())
+
+        # Not due yet, so nothing is picked up
+        self.assertEqual(send_pending_emails(), (0, 0))
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError('SMTP down')):
+            send_pending_emails(max_attempts=2)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, OutboxEmail.FAILED)
+
+
+
+@override_settings(GOOGLE_CLIENT_ID='test-client', GOOGLE_CLIENT_SECRET='secret')
+class GoogleOAuthTests(TestCase):
+    def setUp(self):
+        self.google = self.enterContext(FakeGoogleServer(client_id='test-client'))
+        self.enterContext(override_settings(
+            GOOGLE_TOKEN_URL=self.google.token_url,
+            GOOGLE_JWKS_URL=self.google.jwks_url,
+        ))
+        jwks_cache.clear()
+        self.addCleanup(jwks_cache.clear)
+
+    def test_redirect_url_is_cached(self):
+        gerenate_google_oauth_redirect_url.cache_clear()
+        self.addCleanup(gerenate_google_oauth_redirect_url.cache_clear)
+        response = self.client.get(reverse('accounts:google_oauth'))
+        self.assertTrue(response.url.startswith('https://accounts.google.com/'))
+        self.assertIn('client_id=test-client', response.url)
+        self.client.get(reverse('accounts:google_oauth'))
+        self.assertEqual(gerenate_google_oauth_redirect_url.cache_info().hits, 1)
+
+    def test_login_verifies_id_token_with_cached_keys(self):
+        url = reverse('accounts:google_oauth')
+        response = self.client.get(url, {'code': 'abc'})
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        user = CustomUser.objects.get(email='oauth@example.com')
+        self.assertEqual(user.first_name, 'OAuth User')
+        self.assertEqual(self.client.session['_auth_user_id'], str(user.pk))
+
+        self.client.logout()
+        self.client.get(url, {'code': 'def'})
+        self.assertEqual(self.google.token_requests, 2)
+        self.assertEqual(self.google.jwks_requests, 1)
+
+    def test_token_for_other_client_is_rejected(self):
+        with mock.patch('accounts.views.exchange_code',
+                        return_value={'id_token': self.google.make_id_token(aud='someone-else')}), \
+                self.assertLogs('accounts.views', 'WARNING'):
+            response = self.client.get(reverse('accounts:google_oauth'), {'code': 'abc'})
+        self.assertEqual(response.url, '/accounts/login/?error=invalid_token')
+        self.assertFalse(CustomUser.objects.filter(email='oauth@example.com').exists())
+
+    def test_keys_fetched_on_first_use_shortly_after_boot(self):
+        with mock.patch('accounts.google_auth.time.monotonic', return_value=10.0):
+            response = self.client.get(reverse('accounts:google_oauth'), {'code': 'abc'})
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertEqual(self.google.jwks_requests, 1)
+
+
+
+class NavContextTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass'
+        )
+        self.client.force_login(self.user)
+
+    def test_nav_links_to_create_profile_without_profile(self):
+        self.client.get(reverse('wishlist:wishlist_list'))
+        # session, user (joined with its missing profile), wishlists
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('wishlist:wishlist_list'))
+        self.assertContains(response, reverse('accounts:create_profile'))
+
+    def test_nav_links_to_profile_without_extra_query(self):
+        profile = UserProfile.objects.create(user=self.user, bio="Hi")
+        self.client.get(reverse('wishlist:wishlist_list'))
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('wishlist:wishlist_list'))
+        self.assertContains(response, reverse('accounts:profile', kwargs={'pk': profile.pk}))
+
+    def test_nav_links_to_reserved_gifts(self):
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, f'href="{reverse("wishlist:reserved_gifts")}"')
+
+    def test_sessions_from_model_backend_stay_valid(self):
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = self.client.get(reverse('wishlist:wishlist_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.user, self.user)
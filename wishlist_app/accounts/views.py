@@ -6,21 +6,24 @@ from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import EmailMessage
 from django.conf import settings
 from django.http import HttpResponseRedirect
+import logging
 import requests
 
 from django.contrib.auth.decorators import login_required
 from .forms import UserProfileForm, Interest, EmailLoginForm, RegisterForm, EditUserForm
-from .models import UserProfile, CustomUser
+from .models import UserProfile, CustomUser, OutboxEmail
+from .google_auth import InvalidIdToken, exchange_code, verify_id_token
+
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 
 def register_view(request):
     """
     Handle user registration.
-    Creates a new user, sends an activation email,
+    Creates a new user, queues an activation email in the outbox,
     and renders the registration form.
     """
     if request.method == 'POST':
@@ -42,14 +45,15 @@ def register_view(request):
                 'token': default_token_generator.make_token(user),
             })
 
-            email = EmailMessage(mail_subject, message, settings.EMAIL_HOST_USER, [user.email])
-            email.content_subtype = 'html'  
-            try:
-                email.send(fail_silently=False)
-                return render(request, 'accounts/registration_pending.html')
-            except Exception as e:
-                form.add_error('email', 'Unable to send confirmation to this address. Please check your email.')
-                return render(request, 'accounts/register.html', {'form': form})
+            # Delivered by the send_outbox worker, not during the request
+            OutboxEmail.enqueue(
+                mail_subject,
+                message,
+                user.email,
+                from_email=settings.EMAIL_HOST_USER,
+                content_subtype='html',
+            )
+            return render(request, 'accounts/registration_pending.html')
     else:
         form = RegisterForm()
 
@@ -244,37 +248,33 @@ def edit_profile(request, pk):
 
 
 import urllib.parse
+from functools import lru_cache
 
+@lru_cache(maxsize=None)
 def gerenate_google_oauth_redirect_url():
     """
     Generate the Google OAuth2 authorization redirect URL.
+    The URL only depends on settings, so it is built once per process.
     Returns:
         str: URL to redirect user for Google authentication.
     """
     query_parameters = {
         "client_id": settings.GOOGLE_CLIENT_ID,
-        "redirect_uri": "http://localhost:8000/accounts/auth/google/",
+        "redirect_uri": settings.GOOGLE_REDIRECT_URI,
         "response_type": "code", 
         "scope": "openid profile email",
         "prompt": "consent",
     }
     
     query_string = urllib.parse.urlencode(query_parameters, quote_via=urllib.parse.quote)
-    base_url = "https://accounts.google.com/o/oauth2/v2/auth"
-    
-    final_url = f"{base_url}?{query_string}"
-    
-    
-    print("=== GOOGLE OAUTH DEBUG ===")
-    print("Generated redirect URL:", final_url)
-    print("==========================")
-    
-    return final_url
+    return f"{settings.GOOGLE_AUTH_URL}?{query_string}"
 
 def google_oauth_url(request):
     """
     Handle Google OAuth2 login flow.
     Redirects to Google for authorization or processes the returned code.
+    The id_token from the token response is verified locally against cached
+    signing keys, so no separate userinfo request is needed.
     Args:
         request: HttpRequest object
     Returns:
@@ -289,35 +289,19 @@ def google_oauth_url(request):
     if not code:
         url = gerenate_google_oauth_redirect_url()
         return HttpResponseRedirect(url)
-    
-    token_url = "https://oauth2.googleapis.com/token"
-    data = {
-        "code": code,
-        "client_id": settings.GOOGLE_CLIENT_ID,
-        "client_secret": settings.GOOGLE_CLIENT_SECRET,
-        "redirect_uri": "http://localhost:8000/accounts/auth/google/",
-        "grant_type": "authorization_code",
-    }
 
-    # Get token
     try:
-        r = requests.post(token_url, data=data)
-        token_response = r.json()
-        access_token = token_response.get("access_token")
+        token_response = exchange_code(code)
+        id_token = token_response.get("id_token")
 
-        if not access_token:
+        if not id_token:
             return HttpResponseRedirect("/accounts/login/")  # або сторінка з помилкою
 
-        #Get information about user
-        user_info = requests.get(
-            "https://www.googleapis.com/oauth2/v2/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"}
-        ).json()
-
-        email = user_info.get("email")
-        name = user_info.get("name")
+        claims = verify_id_token(id_token)
+        email = claims.get("email")
+        name = claims.get("name", "")
 
-        if not email:
+        if not email or not claims.get("email_verified"):
             return HttpResponseRedirect("/accounts/login/")
 
         # Create or get user
@@ -326,13 +310,15 @@ def google_oauth_url(request):
         defaults={"username": email, "first_name": name}
         )
         
-        login(request, user)
+        login(request, user, backend='accounts.backends.ProfileModelBackend')
         return HttpResponseRedirect("/")
     
+    except InvalidIdToken as e:
+        logger.warning("Invalid id_token: %s", e)
+        return HttpResponseRedirect("/accounts/login/?error=invalid_token")
     except requests.exceptions.RequestException as e:
         print("Request error:", e)
         return HttpResponseRedirect("/accounts/login/?error=request_failed")
     except Exception as e:
         print("Unexpected error:", e)
         return HttpResponseRedirect("/accounts/login/?error=unexpected")
-    
\ No newline at end of file
@@ -0,0 +1,150 @@
+import calendar
+import datetime
+from itertools import groupby
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import ExtractDay, ExtractMonth
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from accounts.models import OutboxEmail
+
+from .models import WishlistShare
+
+
+def _month_day(date):
+    return date.month * 100 + date.day
+
+
+def with_upcoming_birthday(users, days, today=None):
+    """
+    Filter a user queryset to birthdays in the ``days`` days from today on.
+
+    Compares the same month * 100 + day expression as the user_birthday_idx
+    index, so the database answers with a range scan. A window that crosses
+    New Year becomes two ranges (end of December, start of January).
+    """
+    today = today or timezone.localdate()
+    last_day = today + datetime.timedelta(days=days)
+    start, end = _month_day(today), _month_day(last_day)
+    if end == 228 and not calendar.isleap(last_day.year):
+        end = 229
+    users = users.annotate(birthday=ExtractMonth('date_of_birth') * 100 + ExtractDay('date_of_birth'))
+    if days >= 365:
+        return users.filter(birthday__isnull=False)
+    if start <= end:
+        return users.filter(birthday__gte=start, birthday__lte=end)
+    return users.filter(Q(birthday__gte=start) | Q(birthday__lte=end))
+
+
+def next_birthday(date_of_birth, today):
+    """Next occurrence of a birthday on or after today (29 February falls on the 28th in other years)."""
+    for year in (today.year, today.year + 1):
+        try:
+            birthday = date_of_birth.replace(year=year)
+        except ValueError:
+            birthday = datetime.date(year, 2, 28)
+        if birthday >= today:
+            return birthday
+
+
+def upcoming_birthdays(user, days=None, today=None):
+    """
+    Friends of ``user`` with a birthday in the next ``days`` days, soonest first.
+    Friends are the owners of wishlists shared with the user (WishlistShare).
+    Returns:
+        list: (friend, birthday date, days until) tuples.
+    """
+    days = settings.BIRTHDAY_REMINDER_DAYS if days is None else days
+    today = today or timezone.localdate()
+    friends = with_upcoming_birthday(
+        get_user_model().objects.filter(
+            wishlists__shares__shared_with=user,
+            wishlists__deleted_at__isnull=True,
+        ).distinct(),
+        days,
+        today,
+    )
+    reminders = []
+    for friend in friends:
+        birthday = next_birthday(friend.date_of_birth, today)
+        reminders.append((friend, birthday, (birthday - today).days))
+    reminders.sort(key=lambda reminder: (reminder[2], reminder[0].pk))
+    return reminders
+
+
+def cached_upcoming_birthdays(user):
+    """
+    upcoming_birthdays() for the dashboard widget, cached per user and day
+    for BIRTHDAY_WIDGET_CACHE_TIMEOUT seconds.
+    """
+    today = timezone.localdate()
+    key = f"birthdays:{user.pk}:{today.isoformat()}"
+    reminders = cache.get(key)
+    if reminders is None:
+        reminders = upcoming_birthdays(user, today=today)
+        cache.set(key, reminders, settings.BIRTHDAY_WIDGET_CACHE_TIMEOUT)
+    return reminders
+
+
+def queue_birthday_digests(days=None, today=None, batch_size=None):
+    """
+    Queue one digest email per user with friends' birthdays coming up.
+
+    Users with a birthday in the window come from the birthday index; the
+    people their wishlists are shared with are then streamed ordered by
+    recipient, and the emails are inserted into the outbox batch_size at a
+    time (send_outbox delivers them in batches too).
+    Returns:
+        int: Number of digests queued.
+    """
+    days = settings.BIRTHDAY_REMINDER_DAYS if days is None else days
+    batch_size = batch_size or settings.BIRTHDAY_DIGEST_BATCH
+    today = today or timezone.localdate()
+    birthday_users = {
+        user.pk: (user, next_birthday(user.date_of_birth, today))
+        for user in with_upcoming_birthday(get_user_model().objects.filter(is_active=True), days, today)
+    }
+    if not birthday_users:
+        return 0
+
+    pairs = (
+        WishlistShare.objects.filter(
+            wishlist__user_id__in=birthday_users,
+            wishlist__deleted_at__isnull=True,
+            shared_with__is_active=True,
+        )
+        .values_list('shared_with_id', 'shared_with__email', 'shared_with__username', 'wishlist__user_id')
+        .order_by('shared_with_id', 'wishlist__user_id')
+        .distinct()
+    )
+    queued = 0
+    batch = []
+    for (_, email, username), rows in groupby(pairs.iterator(), key=lambda row: row[:3]):
+        friends = sorted(
+            {birthday_users[row[3]] for row in rows if row[3] in birthday_users},
+            key=lambda friend: friend[1],
+        )
+        body = render_to_string('wishlist/birthday_digest_email.html', {
+            'username': username,
+            'reminders': [(friend, birthday, (birthday - today).days) for friend, birthday in friends],
+            'domain': settings.SITE_DOMAIN,
+        })
+        batch.append(OutboxEmail(
+            subject="Upcoming birthdays among your friends",
+            body=body,
+            to=email,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            content_subtype='html',
+        ))
+        if len(batch) >= batch_size:
+            OutboxEmail.objects.bulk_create(batch)
+            queued += len(batch)
+            batch = []
+    if batch:
+        OutboxEmail.objects.bulk_create(batch)
+        queued += len(batch)
+    return queued
@@ -0,0 +1,120 @@
+from collections import Counter
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Case, Value, When
+
+from . import feed, live, suggestions
+from .models import Item
+from .purge import delete_item_images
+
+_bulk_operation = ContextVar('bulk_item_operation', default=False)
+
+
+def in_bulk_operation():
+    """True while a bulk delete runs; the per-item signal handlers skip their fan-out."""
+    return _bulk_operation.get()
+
+
+def _fan_out_removed(items):
+    """Publish removal events and update the feed once per source wishlist."""
+    counts, reserved = Counter(), Counter()
+    for item in items:
+        counts[item.wishlist_id] += 1
+        reserved[item.wishlist_id] += item.is_reserved
+        live.publish_item_event(item, 'item-removed')
+    for wishlist_id, count in counts.items():
+        feed.items_removed(wishlist_id, count, reserved[wishlist_id])
+
+
+def _fan_out_added(items, target):
+    for item in items:
+        live.publish_item_event(item, 'item-added')
+    feed.items_added(target.pk, len(items), sum(item.is_reserved for item in items))
+
+
+def move_items(items, target):
+    """
+    Move items to the end of another wishlist with a single UPDATE.
+    Reservations are kept.
+    Args:
+        items (iterable): Items to move.
+        target (Wishlist): Destination wishlist.
+    Returns:
+        int: Number of items moved (items already in target are skipped).
+    """
+    items = [item for item in items if item.wishlist_id != target.pk]
+    if not items:
+        return 0
+    with transaction.atomic():
+        ranks = Item.append_ranks(target.pk, len(items))
+        Item.objects.filter(pk__in=[item.pk for item in items]).update(
+            wishlist=target,
+            rank=Case(*[When(pk=item.pk, then=Value(rank)) for item, rank in zip(items, ranks)]),
+        )
+        _fan_out_removed(items)
+        for item, rank in zip(items, ranks):
+            item.wishlist, item.rank = target, rank
+        _fan_out_added(items, target)
+    return len(items)
+
+
+def copy_items(items, target):
+    """
+    Copy items to the end of a wishlist with bulk_create.
+    Copies point at the same image files as their originals; files are only
+    deleted once no item references them (see purge.delete_item_images).
+    Reservations are not copied.
+    Args:
+        items (iterable): Items to copy.
+        target (Wishlist): Destination wishlist (may be the items' own).
+    Returns:
+        list: The new items.
+    """
+    items = list(items)
+    if not items:
+        return []
+    with transaction.atomic():
+        ranks = Item.append_ranks(target.pk, len(items))
+        copies = Item.objects.bulk_create([
+            Item(
+                wishlist=target,
+                title=item.title,
+                url=item.url,
+                url_hash=item.url_hash,
+                price=item.price,
+                image=item.image.name or None,
+                image_url=item.image_url,
+                description=item.description,
+                rank=rank,
+            )
+            for item, rank in zip(items, ranks)
+        ], batch_size=500)
+        suggestions.index_items(copies)
+        _fan_out_added(copies, target)
+    return copies
+
+
+def delete_items(items):
+    """
+    Delete items with one batched DELETE. Their image files are removed
+    after the transaction commits, unless a copy still references them.
+    Args:
+        items (iterable): Items to delete.
+    Returns:
+        int: Number of items deleted.
+    """
+    items = list(items)
+    if not items:
+        return 0
+    images = [item.image.name for item in items if item.image]
+    token = _bulk_operation.set(True)
+    try:
+        with transaction.atomic():
+            Item.objects.filter(pk__in=[item.pk for item in items]).delete()
+            _fan_out_removed(items)
+            if images:
+                transaction.on_commit(lambda: delete_item_images(images))
+    finally:
+        _bulk_operation.reset(token)
+    return len(items)
@@ -0,0 +1,93 @@
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.db.models import Q
+
+from .models import Item
+
+# Query parameters that only track where a visitor came from.
+TRACKING_PARAMS = {
+    'gclid', 'gclsrc', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'twclid', 'ttclid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', 'ref', 'ref_src', 'srsltid', 'spm',
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_')
+
+
+def canonicalize_url(url):
+    """
+    Normalize a product URL so that links to the same page compare equal.
+
+    The scheme becomes https, the host is lowercased without "www." and
+    default ports, the fragment and tracking parameters (utm_*, gclid,
+    fbclid, ...) are dropped, the remaining parameters are sorted and a
+    trailing slash is removed from the path.
+    Args:
+        url (str): URL as entered or scraped.
+    Returns:
+        str: Canonical URL, or '' for an empty URL.
+    """
+    url = (url or '').strip()
+    if not url:
+        return ''
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower().removeprefix('www.')
+    try:
+        port = parts.port
+    except ValueError:
+        # Out-of-range port: keep the host as entered rather than fail.
+        host, port = parts.netloc.lower().removeprefix('www.'), None
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip('/') or '/'
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit(('https', host, path, urlencode(query), ''))
+
+
+def url_hash(url):
+    """SHA-256 of the canonical URL ('' for an empty URL), stored in Item.url_hash."""
+    canonical = canonicalize_url(url)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest() if canonical else ''
+
+
+def find_duplicate(wishlist, url, exclude_pk=None):
+    """Return an item of the wishlist pointing at the same product as url, or None."""
+    digest = url_hash(url)
+    if not digest:
+        return None
+    items = Item.objects.filter(wishlist=wishlist, url_hash=digest)
+    if exclude_pk:
+        items = items.exclude(pk=exclude_pk)
+    return items.first()
+
+
+def reusable_product_data(url, exclude_pk=None):
+    """
+    Product data already stored on another item with the same canonical URL,
+    in the format of scraping.scrape_product_data plus ``image_name`` (the
+    existing file, shared rather than copied). Used instead of fetching the
+    page again. Descriptions are the owner's own notes and are not copied.
+    Returns:
+        dict: Title, price and image of the newest such item
+        that has a price or an image, or {} if there is none.
+    """
+    digest = url_hash(url)
+    if not digest:
+        return {}
+    # Only items that were actually enriched (by a scrape or by hand) are worth copying.
+    donors = Item.objects.filter(url_hash=digest, wishlist__deleted_at__isnull=True).filter(
+        Q(price__isnull=False) | ~Q(image_url='') | (Q(image__isnull=False) & ~Q(image='')),
+    )
+    if exclude_pk:
+        donors = donors.exclude(pk=exclude_pk)
+    donor = donors.order_by('-pk').first()
+    if donor is None:
+        return {}
+    return {
+        'title': donor.title,
+        'price': donor.price,
+        'image_url': donor.image_url,
+        'image_name': donor.image.name or '',
+    }
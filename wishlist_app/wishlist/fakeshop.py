@@ -0,0 +1,212 @@
+import hashlib
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from PIL import Image
+
+CORPUS_DIR = Path(__file__).resolve().parent / 'scraper_corpus'
+CORPUS_FIELDS = ('title', 'price', 'image_url')
+
+PRODUCT_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+    <title>Product {product_id}</title>
+    <meta property="og:image" content="{base_url}/images/{product_id}.png{image_query}">
+</head>
+<body>
+    <h1>Fake product {product_id}</h1>
+    <span class="product-price">{price} UAH</span>
+    {padding}
+</body>
+</html>"""
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def _make_png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (200, 80, 120)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class FakeShopServer:
+    """
+    Local HTTP server standing in for a remote shop.
+
+    Serves product pages at ``/products/<id>`` (with an og:image tag and a
+    price) and their images at ``/images/<id>.png``. Every response waits
+    ``delay`` seconds first to simulate a slow shop; setting ``status`` to an
+    error code (e.g. 503) makes every request fail with it. Prices can be
+    changed through ``prices`` ({product id: price}); pages carry an ETag
+    and answer a matching If-None-Match with 304. ``image_query`` is
+    appended to the og:image URL as written in the page (HTML-escaped), and
+    requested image paths are kept in ``image_paths``. Used by tests and the
+    scraping benchmark.
+
+    Usage:
+        with FakeShopServer(delay=0.2) as shop:
+            shop.product_url(1)
+    """
+    def __init__(self, delay=0.0, host='127.0.0.1', port=0, padding_bytes=0):
+        self.delay = delay
+        self.host = host
+        self.port = port
+        self.padding = '<p>' + 'x' * padding_bytes + '</p>' if padding_bytes else ''
+        self.image = _make_png()
+        self.status = 200
+        self.prices = {}
+        self.image_query = ''
+        self.image_paths = []
+        self.requests_served = 0
+        self.not_modified_served = 0
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    def product_url(self, product_id):
+        """Return the URL of a fake product page."""
+        return f"{self.base_url}/products/{product_id}"
+
+    def _make_handler(self):
+        shop = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(shop.delay)
+                shop.requests_served += 1
+                parts = self.path.strip('/').split('/')
+                if shop.status != 200:
+                    self.send_error(shop.status)
+                    return
+                etag = None
+                if len(parts) == 2 and parts[0] == 'products':
+                    body = PRODUCT_PAGE.format(
+                        product_id=parts[1],
+                        base_url=shop.base_url,
+                        price=shop.prices.get(parts[1], 100 + len(parts[1])),
+                        image_query=shop.image_query,
+                        padding=shop.padding,
+                    ).encode('utf-8')
+                    content_type = 'text/html; charset=utf-8'
+                    etag = '"%s"' % hashlib.md5(body).hexdigest()
+                    if self.headers.get('If-None-Match') == etag:
+                        shop.not_modified_served += 1
+                        self.send_response(304)
+                        self.send_header('ETag', etag)
+                        self.end_headers()
+                        return
+                elif len(parts) == 2 and parts[0] == 'images':
+                    shop.image_paths.append(self.path)
+                    body = shop.image
+                    content_type = 'image/png'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                if etag:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._server = _Server((self.host, self.port), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def load_corpus(directory=CORPUS_DIR):
+    """
+    Load the scraper corpus manifest.
+    Returns:
+        list: Page entries with 'file', 'expected' and 'known_failures'.
+    """
+    with open(Path(directory) / 'manifest.json', encoding='utf-8') as f:
+        return json.load(f)['pages']
+
+
+def field_matches(field, actual, expected):
+    """Compare an extracted corpus field with its expected value."""
+    if field == 'price':
+        if actual is None or expected is None:
+            return actual is expected
+        return abs(float(actual) - float(expected)) < 0.005
+    return (actual or '') == (expected or '')
+
+
+class CorpusServer:
+    """
+    Local HTTP server that replays the saved product pages of the scraper
+    corpus byte for byte at ``/<file name>``, so scraping can be exercised
+    and benchmarked without network access.
+
+    Usage:
+        with CorpusServer() as server:
+            scrape_product_data(server.page_url('shopify_store.html'))
+    """
+    def __init__(self, directory=CORPUS_DIR):
+        self.directory = Path(directory)
+        self.pages = {
+            page['file']: (self.directory / page['file']).read_bytes()
+            for page in load_corpus(self.directory)
+        }
+        self._server = None
+
+    def page_url(self, file_name):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/{file_name}"
+
+    def _make_handler(self):
+        pages = self.pages
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = pages.get(self.path.lstrip('/'))
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._server = _Server(('127.0.0.1', 0), self._make_handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,139 @@
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import FriendFeedEntry, Wishlist, WishlistShare
+
+
+def _counts(wishlist_ids):
+    """Return {wishlist_id: (item_count, reserved_count)} for the given wishlists."""
+    rows = (
+        Wishlist.objects.filter(pk__in=wishlist_ids)
+        .annotate(item_total=Count('items'), reserved_total=Count('items', filter=Q(items__is_reserved=True)))
+        .values_list('pk', 'item_total', 'reserved_total')
+    )
+    return {pk: (items, reserved) for pk, items, reserved in rows}
+
+
+def add_entries(pairs, activity_at=None):
+    """
+    Create feed entries for newly shared wishlists. Existing entries are kept.
+    Args:
+        pairs (iterable): (wishlist_id, user_id) tuples.
+        activity_at (datetime): Last activity time for the new entries, now by default.
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return
+    activity_at = activity_at or timezone.now()
+    counts = _counts({wishlist_id for wishlist_id, _ in pairs})
+    FriendFeedEntry.objects.bulk_create([
+        FriendFeedEntry(
+            user_id=user_id,
+            wishlist_id=wishlist_id,
+            item_count=counts[wishlist_id][0],
+            reserved_count=counts[wishlist_id][1],
+            last_activity_at=activity_at,
+        )
+        for wishlist_id, user_id in pairs
+        if wishlist_id in counts
+    ], batch_size=500, ignore_conflicts=True)
+
+
+def item_added(item):
+    """Fan an added item out to everyone the wishlist is shared with."""
+    items_added(item.wishlist_id, 1, int(item.is_reserved))
+
+
+def item_removed(item):
+    """Fan a deleted item out to everyone the wishlist is shared with."""
+    items_removed(item.wishlist_id, 1, int(item.is_reserved))
+
+
+def items_added(wishlist_id, count, reserved=0):
+    """Fan ``count`` added items (``reserved`` of them reserved) out in one UPDATE."""
+    FriendFeedEntry.objects.filter(wishlist_id=wishlist_id).update(
+        item_count=F('item_count') + count,
+        reserved_count=F('reserved_count') + reserved,
+        new_items=F('new_items') + count,
+        last_activity_at=timezone.now(),
+    )
+
+
+def items_removed(wishlist_id, count, reserved=0):
+    """Fan ``count`` removed items (``reserved`` of them reserved) out to the feed."""
+    entries = FriendFeedEntry.objects.filter(wishlist_id=wishlist_id)
+    entries.update(
+        item_count=Greatest(F('item_count') - count, 0),
+        new_items=Greatest(F('new_items') - count, 0),
+        reserved_count=Greatest(F('reserved_count') - reserved, 0),
+    )
+
+
+def reservation_changed(item, delta):
+    """
+    Fan a reservation (delta=1) or cancellation (delta=-1) out to the feed.
+    """
+    entries = FriendFeedEntry.objects.filter(wishlist_id=item.wishlist_id)
+    if delta < 0:
+        entries = entries.filter(reserved_count__gt=0)
+    entries.update(reserved_count=F('reserved_count') + delta, last_activity_at=timezone.now())
+
+
+def mark_seen(user_id, wishlist_id):
+    """
+    Reset the "new items" counter when a user opens a wishlist.
+    The entry is read first and only written when it has unseen items, so
+    repeat views issue no write (and do not pin the user to the primary
+    database, see wishlist_app.routers).
+    """
+    entries = FriendFeedEntry.objects.filter(user_id=user_id, wishlist_id=wishlist_id, new_items__gt=0)
+    if entries.exists():
+        entries.update(new_items=0, last_seen_at=timezone.now())
+
+
+def rebuild(user_ids=None):
+    """
+    Recreate feed entries from WishlistShare, e.g. after a bulk import.
+    Args:
+        user_ids (iterable): Only rebuild these users' feeds; all users by default.
+    Returns:
+        int: Number of entries created.
+    """
+    shares = WishlistShare.objects.filter(wishlist__deleted_at__isnull=True)
+    entries = FriendFeedEntry.objects.all()
+    if user_ids is not None:
+        shares = shares.filter(shared_with_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+    entries.delete()
+
+    created = 0
+    rows = shares.values_list('wishlist_id', 'shared_with_id', 'shared_at').order_by('pk')
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        batch.append(row)
+        if len(batch) == 2000:
+            created += _add_backfilled(batch)
+            batch = []
+    created += _add_backfilled(batch)
+    return created
+
+
+def _add_backfilled(rows):
+    if not rows:
+        return 0
+    counts = _counts({wishlist_id for wishlist_id, _, _ in rows})
+    # A wishlist can be soft-deleted between reading the shares and counting its items.
+    entries = [
+        FriendFeedEntry(
+            user_id=user_id,
+            wishlist_id=wishlist_id,
+            item_count=counts[wishlist_id][0],
+            reserved_count=counts[wishlist_id][1],
+            last_activity_at=shared_at,
+        )
+        for wishlist_id, user_id, shared_at in rows
+        if wishlist_id in counts
+    ]
+    FriendFeedEntry.objects.bulk_create(entries, batch_size=500, ignore_conflicts=True)
+    return len(entries)
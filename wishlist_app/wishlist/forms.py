@@ -1,4 +1,5 @@
 from django import forms
+from wishlist_app.images import NormalizedImagesMixin
 from .models import Wishlist, Item
 
 class WishlistForm(forms.ModelForm):
@@ -7,14 +8,40 @@ class WishlistForm(forms.ModelForm):
         model = Wishlist
         fields = ['name']
         
-class WishlistImageForm(forms.ModelForm):
-    """Form for editing the image of a wishlist."""
+class WishlistImageForm(NormalizedImagesMixin, forms.ModelForm):
+    """Form for editing the image of a wishlist. Uploads are normalized."""
+    normalized_image_fields = ('image',)
+
     class Meta:
         model = Wishlist
         fields = ['image']
 
-class ItemForm(forms.ModelForm):
-    """Form for creating or editing an item in a wishlist."""
+class ItemForm(NormalizedImagesMixin, forms.ModelForm):
+    """Form for creating or editing an item in a wishlist. Uploads are normalized."""
+    normalized_image_fields = ('image',)
+
     class Meta:
         model = Item
-        fields = ['title', 'url', 'price', 'image', 'description']
\ No newline at end of file
+        fields = ['title', 'url', 'price', 'image', 'description']
+
+class BulkItemForm(forms.Form):
+    """
+    Move, copy or delete several items of a wishlist at once.
+    Only items of ``source`` and the owner's own wishlists can be chosen.
+    """
+    ACTIONS = [('move', 'Move to'), ('copy', 'Copy to'), ('delete', 'Delete')]
+
+    action = forms.ChoiceField(choices=ACTIONS)
+    items = forms.ModelMultipleChoiceField(queryset=Item.objects.none())
+    target = forms.ModelChoiceField(queryset=Wishlist.objects.none(), required=False)
+
+    def __init__(self, source, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['items'].queryset = Item.objects.filter(wishlist=source)
+        self.fields['target'].queryset = Wishlist.objects.filter(user=source.user)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('action') in ('move', 'copy') and not cleaned_data.get('target'):
+            self.add_error('target', "Choose a wishlist.")
+        return cleaned_data
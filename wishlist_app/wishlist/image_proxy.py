@@ -0,0 +1,115 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from wishlist_app.images import normalize_image
+
+from .scraping import download_image
+
+logger = logging.getLogger(__name__)
+
+_evict_lock = threading.Lock()
+
+
+def url_key(image_url):
+    """Stable cache key (and URL version) for a remote image URL."""
+    return hashlib.sha256(image_url.encode('utf-8')).hexdigest()
+
+
+class ImageCache:
+    """
+    Size-bounded disk cache of normalized remote images, evicted in LRU order.
+
+    Files are named after url_key() and sharded by its first two characters.
+    A hit refreshes the file's mtime, and when a new file pushes the total
+    over max_bytes the least recently used files are removed.
+    """
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = Path(directory or settings.IMAGE_PROXY_CACHE_DIR)
+        self.max_bytes = max_bytes or settings.IMAGE_PROXY_CACHE_MAX_BYTES
+
+    def _path(self, key):
+        return self.directory / key[:2] / key
+
+    def get(self, key):
+        """Return the cached file path for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, content):
+        """Store content atomically under key and enforce the size bound."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, path)
+        self.evict()
+        return path
+
+    def evict(self):
+        with _evict_lock:
+            files = []
+            total = 0
+            for shard in os.scandir(self.directory):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.is_file() and not entry.name.startswith('.tmp-'):
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, file_path in sorted(files):
+                try:
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+
+def content_type(path):
+    """Guess the content type of a cached image from its magic bytes."""
+    with open(path, 'rb') as f:
+        head = f.read(12)
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head.startswith(b'\x89PNG'):
+        return 'image/png'
+    return 'image/jpeg'
+
+
+def get_cached_image(image_url, cache=None):
+    """
+    Return the path of a normalized copy of image_url, fetching it on a miss.
+    Returns:
+        Path | None: Cached file (WebP or JPEG/PNG), or None if the image is unavailable.
+    """
+    cache = cache or ImageCache()
+    key = url_key(image_url)
+    path = cache.get(key)
+    if path is not None:
+        return path
+
+    content = download_image(image_url, settings.IMAGE_PROXY_MAX_DOWNLOAD_BYTES)
+    if content is None:
+        return None
+    try:
+        image = normalize_image(content, key)
+    except ValidationError:
+        logger.warning("Not an image: %s", image_url)
+        return None
+    return cache.put(key, image.read())
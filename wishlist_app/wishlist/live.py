@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+
+# Local subscribers per wishlist: {wishlist_id: {(loop, asyncio.Event), ...}}
+_waiters = {}
+_waiters_lock = threading.Lock()
+
+MAX_REPLAY = 100
+
+
+def _seq_key(wishlist_id):
+    return f"live:{wishlist_id}:seq"
+
+
+def _event_key(wishlist_id, seq):
+    return f"live:{wishlist_id}:{seq}"
+
+
+def publish(wishlist_id, event, data):
+    """
+    Publish an event to everyone watching a wishlist.
+
+    Events are numbered per wishlist and kept in the cache for
+    LIVE_EVENT_TTL seconds, so subscribers in other processes pick them up
+    on their next poll (when CACHES is shared) and reconnecting clients can
+    resume from Last-Event-ID. Subscribers in this process are woken at once.
+    Args:
+        wishlist_id (int): Wishlist the event belongs to.
+        event (str): Event name, e.g. 'reserved'.
+        data (dict): JSON-serialisable payload.
+    Returns:
+        int: Sequence number of the event.
+    """
+    cache.add(_seq_key(wishlist_id), 0, timeout=None)
+    seq = cache.incr(_seq_key(wishlist_id))
+    cache.set(_event_key(wishlist_id, seq), (event, data), timeout=settings.LIVE_EVENT_TTL)
+
+    with _waiters_lock:
+        waiters = list(_waiters.get(wishlist_id, ()))
+    for loop, wakeup in waiters:
+        loop.call_soon_threadsafe(wakeup.set)
+    return seq
+
+
+def current_seq(wishlist_id):
+    return cache.get(_seq_key(wishlist_id), 0)
+
+
+def events_since(wishlist_id, last_seq):
+    """
+    Return the (seq, event, data) tuples published after last_seq, oldest first.
+    Events that already expired from the cache are skipped.
+    """
+    latest = current_seq(wishlist_id)
+    if latest <= last_seq:
+        return []
+    first = max(last_seq + 1, latest - MAX_REPLAY + 1)
+    keys = {_event_key(wishlist_id, seq): seq for seq in range(first, latest + 1)}
+    found = cache.get_many(keys)
+    return [(keys[key], *found[key]) for key in sorted(found, key=keys.get)]
+
+
+async def subscribe(wishlist_id, last_seq=None):
+    """
+    Async generator over a wishlist's events, for an SSE response.
+
+    Yields (seq, event, data) tuples, and (None, None, None) every
+    LIVE_HEARTBEAT_SECONDS without events so the caller can send a keep-alive.
+    Stops after LIVE_STREAM_MAX_SECONDS; the browser then reconnects with
+    Last-Event-ID and misses nothing.
+    Args:
+        wishlist_id (int): Wishlist to watch.
+        last_seq (int): Last event the client has seen; None to start from now.
+    """
+    loop = asyncio.get_running_loop()
+    wakeup = asyncio.Event()
+    waiter = (loop, wakeup)
+    with _waiters_lock:
+        _waiters.setdefault(wishlist_id, set()).add(waiter)
+
+    try:
+        if last_seq is None:
+            last_seq = await asyncio.to_thread(current_seq, wishlist_id)
+        deadline = time.monotonic() + settings.LIVE_STREAM_MAX_SECONDS
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            wakeup.clear()
+            if await asyncio.to_thread(current_seq, wishlist_id) < last_seq:
+                last_seq = 0  # the counter was evicted from the cache
+            for seq, event, data in await asyncio.to_thread(events_since, wishlist_id, last_seq):
+                last_seq = seq
+                last_sent = time.monotonic()
+                yield seq, event, data
+            if time.monotonic() - last_sent >= settings.LIVE_HEARTBEAT_SECONDS:
+                last_sent = time.monotonic()
+                yield None, None, None
+            timeout = min(settings.LIVE_POLL_INTERVAL, max(0, deadline - time.monotonic()))
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        with _waiters_lock:
+            waiters = _waiters.get(wishlist_id)
+            waiters.discard(waiter)
+            if not waiters:
+                del _waiters[wishlist_id]
+
+
+def publish_item_event(item, event):
+    """
+    Publish an item change once the current transaction commits.
+    'item-added' events carry the rendered card as seen by a friend;
+    views.wishlist_events swaps in the owner's card on the owner's stream.
+    """
+    wishlist_id = item.wishlist_id
+    data = {'item': item.pk, 'title': item.title}
+
+    def send():
+        if event == 'item-added':
+            data['html'] = render_to_string('wishlist/_public_item.html', {'item': item, 'is_owner': False})
+        publish(wishlist_id, event, data)
+
+    transaction.on_commit(send)
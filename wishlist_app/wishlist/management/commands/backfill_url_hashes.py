@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from wishlist.canonical import url_hash
+from wishlist.models import Item
+
+
+class Command(BaseCommand):
+    """
+    Fill in Item.url_hash for items saved before it existed, or recompute
+    all hashes with --all after the canonicalization rules change.
+    Rows are read and updated --batch-size at a time.
+    """
+    help = "Compute canonical URL hashes of items in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recompute every hash, not only missing ones.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        items = Item.objects.exclude(url='')
+        if not options['all']:
+            items = items.filter(url_hash='')
+        updated = 0
+        batch = []
+        for item in items.only('pk', 'url', 'url_hash').order_by('pk').iterator(chunk_size=options['batch_size']):
+            digest = url_hash(item.url)
+            if digest != item.url_hash:
+                item.url_hash = digest
+                batch.append(item)
+            if len(batch) >= options['batch_size']:
+                updated += Item.objects.bulk_update(batch, ['url_hash'])
+                batch = []
+        if batch:
+            updated += Item.objects.bulk_update(batch, ['url_hash'])
+        self.stdout.write(f"Updated {updated} item(s).")
@@ -0,0 +1,81 @@
+import json
+import time
+import tracemalloc
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from wishlist.fakeshop import CORPUS_FIELDS, CorpusServer, field_matches, load_corpus
+from wishlist.scraping import HEADERS, PARSER_STRATEGIES, parse_product_html
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the product parser offline against the saved page corpus.
+
+    Pages are fetched once from a local CorpusServer, then every parser
+    strategy parses the whole corpus --repeat times. For each strategy the
+    command reports pages/sec, peak traced memory of a single pass and
+    per-field extraction accuracy, as JSON.
+
+    Example:
+        python manage.py bench_parsers --repeat 50
+    """
+    help = "Measure parser speed, memory and accuracy on the offline scraper corpus."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--strategies', nargs='+', default=PARSER_STRATEGIES)
+        parser.add_argument('--output', help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        unknown = set(options['strategies']) - set(PARSER_STRATEGIES)
+        if unknown:
+            raise CommandError(f"Unavailable parser strategies: {', '.join(sorted(unknown))}")
+
+        with CorpusServer() as server:
+            pages = []
+            for entry in load_corpus(server.directory):
+                resp = requests.get(server.page_url(entry['file']), headers=HEADERS, timeout=10)
+                resp.raise_for_status()
+                pages.append((entry, resp.text))
+
+        report = {'pages': len(pages), 'repeat': options['repeat'], 'strategies': {}}
+        for strategy in options['strategies']:
+            report['strategies'][strategy] = self.run_strategy(strategy, pages, options['repeat'])
+
+        output = json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + "\n")
+        self.stdout.write(output)
+
+    def run_strategy(self, strategy, pages, repeat):
+        tracemalloc.start()
+        results = [parse_product_html(html, parser=strategy) for _, html in pages]
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for _, html in pages:
+                parse_product_html(html, parser=strategy)
+        elapsed = time.perf_counter() - started
+
+        accuracy = {}
+        failures = []
+        for field in CORPUS_FIELDS:
+            correct = 0
+            for (entry, _), result in zip(pages, results):
+                if field_matches(field, result.get(field), entry['expected'][field]):
+                    correct += 1
+                else:
+                    failures.append(f"{entry['file']}:{field}")
+            accuracy[field] = round(correct / len(pages), 3)
+
+        return {
+            'pages_per_second': round(len(pages) * repeat / elapsed, 1),
+            'peak_memory_kb': round(peak / 1024, 1),
+            'accuracy': accuracy,
+            'failures': failures,
+        }
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from wishlist.fakeshop import FakeShopServer
+from wishlist.models import Item, Wishlist
+
+
+class Command(BaseCommand):
+    """
+    Compare item_create throughput through the WSGI and ASGI handlers.
+
+    Both runs post items whose URL points at a local FakeShopServer that
+    answers every request after --delay seconds. The WSGI run emulates a
+    worker with --threads threads; the ASGI run uses a single event loop with
+    up to --concurrency requests in flight. Per-host scrape limits are lifted
+    for the run, since every request goes to the same fake shop. Prints the
+    results as JSON.
+
+    Example:
+        python manage.py bench_scrape --requests 200 --delay 0.3 --threads 4
+    """
+    help = "Benchmark scrape-bound item creation under WSGI vs ASGI."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--delay', type=float, default=0.3, help="Fake shop latency in seconds.")
+        parser.add_argument('--threads', type=int, default=4, help="WSGI worker threads.")
+        parser.add_argument('--concurrency', type=int, default=100, help="In-flight ASGI requests.")
+
+    def handle(self, *args, **options):
+        user = CustomUser.objects.create_user(
+            email=f"bench-{time.time_ns()}@example.com",
+            username="bench",
+            password=None,
+        )
+        wishlist = Wishlist.objects.create(user=user, name="Scrape benchmark")
+        url = reverse('wishlist:item_create', args=[wishlist.pk])
+
+        try:
+            with FakeShopServer(delay=options['delay']) as shop, \
+                    override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                                      SCRAPE_HOST_CONCURRENCY=10 ** 6,
+                                      SCRAPE_HOST_RATE=10 ** 6,
+                                      SCRAPE_HOST_BURST=10 ** 6):
+                results = {
+                    'requests': options['requests'],
+                    'shop_delay': options['delay'],
+                    'wsgi': self.run_wsgi(user, url, shop, options),
+                    'asgi': asyncio.run(self.run_asgi(user, url, shop, options)),
+                }
+        finally:
+            for item in Item.objects.filter(wishlist=wishlist).exclude(image=''):
+                item.image.delete(save=False)
+            user.delete()
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run_wsgi(self, user, url, shop, options):
+        def worker(indexes):
+            client = Client()
+            client.force_login(user)
+            return [
+                client.post(url, {'title': 'wsgi', 'url': shop.product_url(f"w{index}")}).status_code
+                for index in indexes
+            ]
+
+        threads = options['threads']
+        chunks = [range(i, options['requests'], threads) for i in range(threads)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            statuses = [status for chunk in pool.map(worker, chunks) for status in chunk]
+        return self.summary(statuses, time.perf_counter() - started)
+
+    async def run_asgi(self, user, url, shop, options):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def post(index):
+            async with semaphore:
+                response = await client.post(url, {'title': 'asgi', 'url': shop.product_url(f"a{index}")})
+                return response.status_code
+
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(post(i) for i in range(options['requests'])))
+        return self.summary(statuses, time.perf_counter() - started)
+
+    @staticmethod
+    def summary(statuses, elapsed):
+        return {
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(len(statuses) / elapsed, 2),
+            'errors': sum(1 for status in statuses if status != 302),
+        }
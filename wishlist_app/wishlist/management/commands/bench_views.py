@@ -0,0 +1,151 @@
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from wishlist.models import Item, WishlistShare
+
+SCENARIOS = ['public_wishlist', 'friends_wishlists', 'wishlist_list', 'reserve_item', 'edit_profile']
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    """
+    Drive the main wishlist views through the test client concurrently and
+    report latency percentiles, throughput and queries per request as JSON.
+
+    Runs against users created by ``seed_dataset`` (same --prefix). Each
+    worker thread has its own client and database connection. Note that
+    reserve_item and edit_profile write to the database.
+
+    Example:
+        python manage.py seed_dataset --users 1000
+        python manage.py bench_views --requests 500 --concurrency 8 --output bench.json
+    """
+    help = "Benchmark the main views against a seeded dataset."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per view.")
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--views', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.rng_lock = threading.Lock()
+        users = list(
+            CustomUser.objects.filter(email__startswith=f"{options['prefix']}-user-")
+            .select_related('userprofile')
+        )
+        if not users:
+            raise CommandError("No seeded users found. Run seed_dataset first.")
+        self.users = users
+        self.shares = list(
+            WishlistShare.objects.filter(shared_with__in=users)
+            .select_related('wishlist')[:10000]
+        )
+        self.free_items = list(
+            Item.objects.filter(is_reserved=False, wishlist__user__in=users)
+            .values_list('pk', 'wishlist__user_id')[:options['requests'] * 2]
+        )
+
+        if 'public_wishlist' in options['views'] and not self.shares:
+            raise CommandError("public_wishlist needs seeded shares.")
+        if 'reserve_item' in options['views'] and not self.free_items:
+            raise CommandError("reserve_item needs unreserved seeded items.")
+
+        report = {
+            'config': {
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'users': len(users),
+            },
+            'views': {},
+        }
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for scenario in options['views']:
+                report['views'][scenario] = self.run_scenario(scenario, options)
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + "\n")
+        self.stdout.write(output)
+
+    def pick(self, sequence):
+        with self.rng_lock:
+            return self.rng.choice(sequence)
+
+    def build_request(self, scenario, index):
+        """Return (user, method, url, data) for one request of a scenario."""
+        if scenario == 'public_wishlist':
+            share = self.pick(self.shares)
+            return share.shared_with_id, 'get', share.wishlist.get_absolute_url(), None
+        if scenario == 'friends_wishlists':
+            return self.pick(self.users).pk, 'get', reverse('wishlist:friends_wishlists'), None
+        if scenario == 'wishlist_list':
+            return self.pick(self.users).pk, 'get', reverse('wishlist:wishlist_list'), None
+        if scenario == 'reserve_item':
+            item_pk, owner_id = self.free_items[index % len(self.free_items)]
+            user = self.pick([u for u in self.users[:50] if u.pk != owner_id] or self.users)
+            return user.pk, 'post', reverse('wishlist:reserve_item', args=[item_pk]), {}
+        if scenario == 'edit_profile':
+            user = self.pick(self.users)
+            url = reverse('accounts:edit_profile', args=[user.userprofile.pk])
+            return user.pk, 'post', url, {'bio': f"Updated bio {index}"}
+        raise CommandError(f"Unknown scenario {scenario}")
+
+    def run_scenario(self, scenario, options):
+        users_by_pk = {user.pk: user for user in self.users}
+        requests = [self.build_request(scenario, i) for i in range(options['requests'])]
+        chunks = [requests[i::options['concurrency']] for i in range(options['concurrency'])]
+
+        def worker(chunk):
+            client = Client(raise_request_exception=False)
+            logged_in = None
+            results = []
+            for user_pk, method, url, data in chunk:
+                if user_pk != logged_in:
+                    client.force_login(users_by_pk[user_pk])
+                    logged_in = user_pk
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = getattr(client, method)(url, data)
+                    elapsed = time.perf_counter() - started
+                results.append((elapsed, len(queries.captured_queries), response.status_code))
+            connection.close()
+            return results
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = [result for chunk in pool.map(worker, chunks) for result in chunk]
+        wall_time = time.perf_counter() - started
+
+        latencies = [elapsed * 1000 for elapsed, _, _ in results]
+        return {
+            'requests': len(results),
+            'errors': sum(1 for _, _, status in results if status >= 400),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'throughput_rps': round(len(results) / wall_time, 2),
+            'queries_per_request': round(statistics.mean(q for _, q, _ in results), 2),
+        }
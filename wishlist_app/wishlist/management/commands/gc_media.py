@@ -0,0 +1,119 @@
+import os
+import posixpath
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+
+
+def file_fields():
+    """Return (model, field) for every FileField/ImageField of installed models."""
+    return [
+        (model, field)
+        for model in apps.get_models()
+        for field in model._meta.get_fields()
+        if isinstance(field, models.FileField)
+    ]
+
+
+def upload_dir(field):
+    """
+    Static directory a field uploads to: the string upload_to up to the first
+    strftime placeholder, or the ``path`` of a PathAndRename-style callable.
+    """
+    upload_to = field.upload_to
+    if callable(upload_to):
+        upload_to = getattr(upload_to, 'path', '')
+    return upload_to.split('%')[0].rstrip('/')
+
+
+def walk(storage, directory):
+    """
+    Yield (name, modified_time) for every file under directory.
+    Uses os.scandir on local storage so huge directories are streamed.
+    """
+    try:
+        local_root = storage.path(directory)
+    except NotImplementedError:
+        local_root = None
+
+    if local_root is not None:
+        if not os.path.isdir(local_root):
+            return
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            with os.scandir(storage.path(current)) as entries:
+                for entry in entries:
+                    name = posixpath.join(current, entry.name)
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(name)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield name, entry.stat().st_mtime
+        return
+
+    dirs, files = storage.listdir(directory)
+    for file_name in files:
+        name = posixpath.join(directory, file_name)
+        yield name, storage.get_modified_time(name).timestamp()
+    for sub in dirs:
+        yield from walk(storage, posixpath.join(directory, sub))
+
+
+class Command(BaseCommand):
+    """
+    Mark-and-sweep garbage collector for files in MEDIA_ROOT.
+
+    Walks the upload directories of every FileField (or --dir), and checks
+    each batch of listed files against all file columns with one IN query per
+    column. Neither the listing nor the referenced names are held in memory
+    as a whole. Files younger than --min-age hours are kept so uploads that
+    are not saved yet survive. Deletions are capped at --rate per second.
+
+    Example:
+        python manage.py gc_media --dry-run
+        python manage.py gc_media --min-age 48 --rate 20
+    """
+    help = "Delete media files that no model row references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only list the orphaned files.")
+        parser.add_argument('--min-age', type=float, default=24, help="Keep files modified in the last N hours.")
+        parser.add_argument('--rate', type=float, default=50, help="Maximum deletions per second.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dir', action='append', dest='dirs', help="Directory to scan (repeatable).")
+
+    def handle(self, *args, **options):
+        fields = [(model, field) for model, field in file_fields() if field.storage is default_storage]
+        dirs = options['dirs'] or sorted({upload_dir(field) for _, field in fields} - {''})
+        cutoff = (timezone.now() - timedelta(hours=options['min_age'])).timestamp()
+        interval = 1 / options['rate'] if options['rate'] > 0 else 0
+
+        scanned = orphaned = 0
+        for directory in dirs:
+            listing = (name for name, mtime in walk(default_storage, directory) if mtime < cutoff)
+            while batch := list(islice(listing, options['batch_size'])):
+                scanned += len(batch)
+                referenced = set()
+                for model, field in fields:
+                    referenced.update(
+                        model._base_manager.filter(**{f'{field.name}__in': batch}).values_list(field.name, flat=True)
+                    )
+                for name in batch:
+                    if name in referenced:
+                        continue
+                    orphaned += 1
+                    if options['dry_run']:
+                        self.stdout.write(name)
+                        continue
+                    default_storage.delete(name)
+                    if interval:
+                        time.sleep(interval)
+
+        action = "Found" if options['dry_run'] else "Deleted"
+        self.stdout.write(f"Scanned {scanned} file(s) in {', '.join(dirs)}. {action} {orphaned} orphaned file(s).")
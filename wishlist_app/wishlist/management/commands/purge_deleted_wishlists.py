@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from wishlist.purge import purge_deleted_wishlists
+
+
+class Command(BaseCommand):
+    """
+    Remove soft-deleted wishlists with their items, shares and image files.
+
+    Items are deleted --batch-size at a time in separate transactions so a
+    large wishlist never holds long locks. Without --loop, purges everything
+    pending and exits (suitable for cron). With --loop, polls every --interval seconds.
+    """
+    help = "Purge soft-deleted wishlists and their media in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help="Keep running and poll for deleted wishlists.")
+        parser.add_argument('--interval', type=float, default=30.0, help="Polling interval in seconds for --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            purged, items = purge_deleted_wishlists(options['batch_size'])
+            if purged or not options['loop']:
+                self.stdout.write(f"Purged {purged} wishlist(s) with {items} item(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
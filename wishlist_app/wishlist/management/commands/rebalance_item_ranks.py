@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from wishlist.models import Item, Wishlist
+
+
+class Command(BaseCommand):
+    """
+    Rewrite the item rank keys of wishlists flagged with ranks_need_rebalance.
+
+    Keys only grow when items are repeatedly moved into the same gap, so this
+    runs rarely and touches one wishlist per transaction. --all also picks up
+    wishlists with unranked items (e.g. after a bulk import). Without --loop,
+    processes everything pending and exits (suitable for cron). With --loop,
+    polls every --interval seconds.
+    """
+    help = "Rebalance item rank keys that grew too long."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Also rebalance wishlists with unranked items.")
+        parser.add_argument('--loop', action='store_true', help="Keep running and poll for flagged wishlists.")
+        parser.add_argument('--interval', type=float, default=60.0, help="Polling interval in seconds for --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            pks = set(Wishlist.objects.filter(ranks_need_rebalance=True).values_list('pk', flat=True))
+            if options['all']:
+                pks.update(Item.objects.filter(rank='').values_list('wishlist_id', flat=True).distinct())
+            for wishlist in Wishlist.objects.filter(pk__in=pks):
+                wishlist.rebalance_item_ranks()
+            if pks or not options['loop']:
+                self.stdout.write(f"Rebalanced {len(pks)} wishlist(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
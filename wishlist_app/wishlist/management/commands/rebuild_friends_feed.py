@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from wishlist import feed
+
+
+class Command(BaseCommand):
+    """
+    Recreate the materialized friends feed from WishlistShare.
+
+    The feed is kept up to date on write; run this once after deploying it,
+    and after importing shares or items with bulk operations that bypass
+    signals.
+    """
+    help = "Rebuild FriendFeedEntry rows from wishlist shares."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help="Only rebuild this user's feed (repeatable).")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = feed.rebuild(options['user_ids'])
+        self.stdout.write(f"Created {created} feed entries.")
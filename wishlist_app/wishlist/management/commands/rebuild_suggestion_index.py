@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from wishlist.suggestions import rebuild_index
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the ItemToken index used for gift suggestions from all item titles.
+    Only needed after bulk imports that bypass Item.save() or when the
+    tokenizer changes; regular edits keep the index up to date.
+    """
+    help = "Rebuild the item title index used for interest-based gift suggestions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rebuild_index(options['batch_size'])
+        self.stdout.write(f"Indexed {count} item(s).")
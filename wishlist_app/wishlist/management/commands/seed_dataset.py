@@ -0,0 +1,136 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import CustomUser, Interest, UserProfile
+from wishlist import feed, ranking, suggestions
+from wishlist.canonical import url_hash
+from wishlist.models import Item, Wishlist, WishlistShare
+
+WORDS = [
+    'book', 'lamp', 'mug', 'scarf', 'headphones', 'kettle', 'backpack', 'camera',
+    'puzzle', 'candle', 'plant', 'watch', 'sneakers', 'board game', 'notebook',
+    'tea set', 'blanket', 'speaker', 'poster', 'umbrella',
+]
+
+
+class Command(BaseCommand):
+    """
+    Generate a scale dataset for benchmarks with bulk_create.
+
+    Users are created as <prefix>-user-<n>@example.com with an unusable
+    password, each with a profile, liked/disliked interests, wishlists full of
+    items, and shares of other users' wishlists. A fraction of the items
+    on shared wishlists is reserved by the friends they are shared with.
+    The friends feed of the new users is rebuilt at the end.
+
+    Example:
+        python manage.py seed_dataset --users 1000 --wishlists 3 --items 20
+    """
+    help = "Seed users, profiles, interests, wishlists, items, shares and reservations."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--wishlists', type=int, default=3, help="Wishlists per user.")
+        parser.add_argument('--items', type=int, default=10, help="Items per wishlist.")
+        parser.add_argument('--shares', type=int, default=5, help="Friends' wishlists shared with each user.")
+        parser.add_argument('--interests', type=int, default=50, help="Size of the interest pool.")
+        parser.add_argument('--reserved', type=float, default=0.2, help="Fraction of shared items to reserve.")
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        batch_size = options['batch_size']
+
+        with transaction.atomic():
+            password = make_password(None)
+            users = CustomUser.objects.bulk_create([
+                CustomUser(
+                    email=f"{prefix}-user-{n}@example.com",
+                    username=f"{prefix}{n}",
+                    password=password,
+                    date_of_birth=date(1980, 1, 1) + timedelta(days=rng.randrange(365 * 30)),
+                )
+                for n in range(options['users'])
+            ], batch_size=batch_size)
+
+            interests = Interest.objects.bulk_create([
+                Interest(
+                    name=f"{prefix} interest {n}",
+                    type=Interest.LIKE if n % 2 == 0 else Interest.DISLIKE,
+                )
+                for n in range(options['interests'])
+            ], batch_size=batch_size)
+            likes = [i for i in interests if i.type == Interest.LIKE]
+            dislikes = [i for i in interests if i.type == Interest.DISLIKE]
+
+            profiles = UserProfile.objects.bulk_create([
+                UserProfile(user=user, bio=f"Bio of {user.username}") for user in users
+            ], batch_size=batch_size)
+
+            LikeThrough = UserProfile.likes.through
+            DislikeThrough = UserProfile.dislikes.through
+            LikeThrough.objects.bulk_create([
+                LikeThrough(userprofile=profile, interest=interest)
+                for profile in profiles
+                for interest in rng.sample(likes, min(3, len(likes)))
+            ], batch_size=batch_size)
+            DislikeThrough.objects.bulk_create([
+                DislikeThrough(userprofile=profile, interest=interest)
+                for profile in profiles
+                for interest in rng.sample(dislikes, min(2, len(dislikes)))
+            ], batch_size=batch_size)
+
+            wishlists = Wishlist.objects.bulk_create([
+                Wishlist(user=user, name=f"Wishlist {n}", code=f"{prefix}-{user.pk}-{n}")
+                for user in users
+                for n in range(options['wishlists'])
+            ], batch_size=batch_size)
+
+            shares = []
+            shared_with = {}
+            for user in users:
+                candidates = [w for w in rng.sample(wishlists, min(len(wishlists), options['shares'] * 2))
+                              if w.user_id != user.pk][:options['shares']]
+                for wishlist in candidates:
+                    shares.append(WishlistShare(wishlist=wishlist, shared_with=user))
+                    shared_with.setdefault(wishlist.pk, []).append(user)
+            WishlistShare.objects.bulk_create(shares, batch_size=batch_size, ignore_conflicts=True)
+
+            now = timezone.now()
+            items = []
+            ranks = ranking.spaced_keys(options['items'])
+            for wishlist in wishlists:
+                friends = shared_with.get(wishlist.pk, [])
+                for n in range(options['items']):
+                    url = f"https://shop.example.com/products/{wishlist.pk}-{n}"
+                    item = Item(
+                        wishlist=wishlist,
+                        rank=ranks[n],
+                        title=f"{rng.choice(WORDS).capitalize()} {n}",
+                        url=url,
+                        url_hash=url_hash(url),
+                        price=rng.randrange(100, 10000),
+                        description="Seeded item",
+                    )
+                    if friends and rng.random() < options['reserved']:
+                        item.is_reserved = True
+                        item.reserved_by = rng.choice(friends)
+                        item.reserved_at = now
+                    items.append(item)
+            Item.objects.bulk_create(items, batch_size=batch_size)
+            suggestions.index_items(items, batch_size)
+            feed.rebuild([user.pk for user in users])
+
+        reserved = sum(1 for item in items if item.is_reserved)
+        self.stdout.write(
+            f"Created {len(users)} users, {len(interests)} interests, {len(wishlists)} wishlists, "
+            f"{len(items)} items ({reserved} reserved) and {len(shares)} shares."
+        )
@@ -0,0 +1,23 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from wishlist.birthdays import queue_birthday_digests
+
+
+class Command(BaseCommand):
+    """
+    Queue the daily "upcoming birthdays" digest for every user whose friends
+    have a birthday in the next --days days. Meant to run once a day from
+    cron; the emails are delivered by send_outbox.
+    """
+    help = "Queue birthday reminder digests in the email outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help="Look-ahead window (BIRTHDAY_REMINDER_DAYS by default).")
+        parser.add_argument('--batch-size', type=int, default=None, help="Emails inserted per query.")
+        parser.add_argument('--date', type=datetime.date.fromisoformat, default=None, help="Run as of this date (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        queued = queue_birthday_digests(options['days'], options['date'], options['batch_size'])
+        self.stdout.write(f"Queued {queued} birthday digest(s).")
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from wishlist.prices import check_due_prices
+
+
+class Command(BaseCommand):
+    """
+    Re-scrape item prices that are due, --batch-size items at a time.
+
+    Items come off a priority queue ordered by next check time, unreserved
+    items on active wishlists first. Requests are conditional and go through
+    the per-host limits, so unchanged pages and busy shops cost little.
+    Without --loop, works through everything currently due and exits
+    (suitable for cron). With --loop, polls every --interval seconds.
+    """
+    help = "Refresh item prices from their shops and record price changes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help="Keep running and poll for due items.")
+        parser.add_argument('--interval', type=float, default=60.0, help="Polling interval in seconds for --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            totals = {}
+            while True:
+                counts = check_due_prices(options['batch_size'])
+                for status, count in counts.items():
+                    totals[status] = totals.get(status, 0) + count
+                checked = sum(count for status, count in counts.items() if status != 'changed')
+                # Throttled items stay leased, so a batch of them means the shops need a break.
+                if not checked or counts.get('throttled', 0) == checked:
+                    break
+            if any(totals.values()) or not options['loop']:
+                summary = ", ".join(f"{status}: {count}" for status, count in sorted(totals.items()))
+                self.stdout.write(f"Price check done ({summary}).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
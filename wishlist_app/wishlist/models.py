@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 import os
 import uuid
+from datetime import timedelta
 from django.utils.deconstruct import deconstructible
 from django.utils import timezone
 
@@ -8,9 +9,22 @@ from django.conf import settings
 from django.urls import reverse
 from django.utils.text import slugify
 from django.contrib.auth.models import User
+from django.dispatch import Signal
+
+from . import ranking
+
+# Sent by Item.reserve() and Item.cancel_reservation() with ``instance`` and ``user``.
+item_reserved = Signal()
+reservation_cancelled = Signal()
 
 # Create your models here.
 
+class AliveWishlistManager(models.Manager):
+    """Default manager that hides soft-deleted wishlists."""
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Wishlist(models.Model):
     """
     Represents a wishlist created by a user.
@@ -21,19 +35,29 @@ class Wishlist(models.Model):
         created_at (DateTimeField): Timestamp of creation.
         image (ImageField): Optional image for the wishlist.
         shared_with (ManyToManyField): Users with whom the wishlist is shared.
+        deleted_at (DateTimeField): Set when the owner deletes the wishlist; the
+            rows and files are then purged in the background (see wishlist.purge).
+        ranks_need_rebalance (BooleanField): Set when an item rank key grew past
+            RANK_MAX_LENGTH; cleared by rebalance_item_ranks().
     """
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='wishlists')
     name = models.CharField(max_length=200, default="My Wishlist")
     code = models.SlugField(max_length=50, editable=False, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
-    image = models.ImageField(upload_to='wishlist_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='wishlist_images/', blank=True, null=True, db_index=True)
     
     shared_with = models.ManyToManyField(
         settings.AUTH_USER_MODEL,
         related_name='shared_wishlists',
         blank=True
-    )    
+    )
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    ranks_need_rebalance = models.BooleanField(default=False, db_index=True)
+
+    objects = AliveWishlistManager()
+    all_objects = models.Manager()
+
     def __str__(self):
         """Return a string representation of the wishlist."""
         return f"{self.user.username}'s wishlist: {self.name}"
@@ -46,12 +70,37 @@ class Wishlist(models.Model):
             base_code = self.user.email.split('@')[0].lower()
             code = base_code
             counter = 1
-            while Wishlist.objects.filter(code=code).exists():
+            while Wishlist.all_objects.filter(code=code).exists():
                 code = f"{base_code}{counter}"
                 counter += 1
             self.code = code
         super().save(*args, **kwargs)
 
+    def rebalance_item_ranks(self):
+        """
+        Give all items evenly spaced, short rank keys in their current order.
+        Items with an empty rank (created in bulk) go last, oldest first.
+        """
+        with transaction.atomic():
+            items = list(
+                Item.objects.select_for_update().filter(wishlist=self)
+                .annotate(unranked=models.Q(rank=''))
+                .order_by('unranked', 'rank', 'pk')
+            )
+            for item, key in zip(items, ranking.spaced_keys(len(items))):
+                item.rank = key
+            Item.objects.bulk_update(items, ['rank'], batch_size=500)
+            Wishlist.all_objects.filter(pk=self.pk).update(ranks_need_rebalance=False)
+        self.ranks_need_rebalance = False
+
+    def soft_delete(self):
+        """
+        Hide the wishlist immediately; items, shares and files are removed later
+        by the purge_deleted_wishlists command.
+        """
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at'])
+
     def get_absolute_url(self):
         """
         Return the public URL for this wishlist.
@@ -73,7 +122,42 @@ class WishlistShare(models.Model):
     class Meta:
         """Ensure uniqueness of wishlist-user pair."""
         unique_together = ('wishlist', 'shared_with')
-    
+
+
+class FriendFeedEntry(models.Model):
+    """
+    Materialized row of a user's friends feed: one per wishlist shared with them.
+    Maintained on write by wishlist.feed, so the friends page is a single
+    indexed range read.
+    Attributes:
+        user (ForeignKey): User who sees the wishlist in their feed.
+        wishlist (ForeignKey): Wishlist shared with the user.
+        item_count (PositiveIntegerField): Number of items in the wishlist.
+        reserved_count (PositiveIntegerField): Number of reserved items.
+        new_items (PositiveIntegerField): Items added since the user last opened the wishlist.
+        last_activity_at (DateTimeField): Time of the last share, item or reservation change.
+        last_seen_at (DateTimeField): When the user last opened the wishlist.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='friends_feed')
+    wishlist = models.ForeignKey(Wishlist, on_delete=models.CASCADE, related_name='feed_entries')
+    item_count = models.PositiveIntegerField(default=0)
+    reserved_count = models.PositiveIntegerField(default=0)
+    new_items = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        """One entry per user and wishlist; the feed is read newest first."""
+        unique_together = ('user', 'wishlist')
+        indexes = [
+            models.Index(fields=['user', '-last_activity_at'], name='friendfeed_user_activity_idx'),
+        ]
+
+    def __str__(self):
+        """Return a string representation of the feed entry."""
+        return f"{self.user_id} -> {self.wishlist_id}"
+
+
 @deconstructible
 class PathAndRename:
     """
@@ -105,16 +189,24 @@ class Item(models.Model):
         url (URLField): Optional product URL.
         price (DecimalField): Optional price.
         image (ImageField): Optional image.
+        image_url (URLField): Remote product image, served through the image
+            proxy until (or instead of) a local copy in ``image``.
         description (TextField): Optional description.
         is_reserved (BooleanField): Flag indicating if reserved.
         reserved_by (ForeignKey): User who reserved the item.
         reserved_at (DateTimeField): Timestamp of reservation.
+        rank (CharField): Lexicographic position within the wishlist (see wishlist.ranking).
+        url_hash (CharField): SHA-256 of the canonical url (see wishlist.canonical).
+        next_price_check_at (DateTimeField): When the price tracker re-scrapes the url next.
+        etag, last_modified (CharField): Validators of the last fetched page, sent back
+            as If-None-Match / If-Modified-Since.
     """
     wishlist = models.ForeignKey(Wishlist, on_delete=models.CASCADE, related_name='items')
     title = models.CharField(max_length=200)
     url = models.URLField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
-    image = models.ImageField(upload_to=path_and_rename, blank=True, null=True)
+    image = models.ImageField(upload_to=path_and_rename, blank=True, null=True, db_index=True)
+    image_url = models.URLField(max_length=2000, blank=True)
     description = models.TextField(blank=True)
     is_reserved = models.BooleanField(default=False)
     reserved_by = models.ForeignKey(
@@ -125,6 +217,70 @@ class Item(models.Model):
         related_name='reserved_items'
     )
     reserved_at = models.DateTimeField(null=True, blank=True)
+    rank = models.CharField(max_length=255, blank=True, default='')
+    url_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    next_price_check_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    etag = models.CharField(max_length=255, blank=True, default='')
+    last_modified = models.CharField(max_length=64, blank=True, default='')
+
+    class Meta:
+        """Items are shown in rank order, read straight from the (wishlist, rank) index."""
+        ordering = ['rank', 'pk']
+        indexes = [
+            models.Index(fields=['wishlist', 'rank'], name='item_wishlist_rank_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Override save method to hash the canonical URL (scheduling price checks
+        when it changes) and to append new items after the last ranked item.
+        """
+        from .canonical import url_hash
+        digest = url_hash(self.url)
+        if digest != self.url_hash:
+            # A new product page: forget the old page's validators and track the new one.
+            self.url_hash = digest
+            self.etag = self.last_modified = ''
+            self.next_price_check_at = (
+                timezone.now() + timedelta(seconds=settings.PRICE_CHECK_INTERVAL) if digest else None
+            )
+        if not self.rank:
+            self.rank, = Item.append_ranks(self.wishlist_id, 1)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def append_ranks(wishlist_id, count):
+        """
+        Return ``count`` increasing rank keys that sort after every item of the wishlist.
+        Flags the wishlist for rebalancing if the keys get too long.
+        """
+        last = (
+            Item.objects.filter(wishlist_id=wishlist_id).exclude(rank='')
+            .order_by('-rank').values_list('rank', flat=True).first()
+        )
+        keys = []
+        for _ in range(count):
+            last = ranking.key_after(last)
+            keys.append(last)
+        if keys and len(keys[-1]) > settings.RANK_MAX_LENGTH:
+            Wishlist.all_objects.filter(pk=wishlist_id).update(ranks_need_rebalance=True)
+        return keys
+
+    def move_between(self, before, after):
+        """
+        Move the item between two neighbours by updating its rank only.
+        Args:
+            before (Item | None): Item that should precede it, None for the start.
+            after (Item | None): Item that should follow it, None for the end.
+        Raises:
+            ValueError: If the neighbours' ranks leave no room (empty or out of order).
+        """
+        self.rank = ranking.key_between(before.rank if before else None, after.rank if after else None)
+        Item.objects.filter(pk=self.pk).update(rank=self.rank)
+        if len(self.rank) > settings.RANK_MAX_LENGTH:
+            Wishlist.all_objects.filter(pk=self.wishlist_id, ranks_need_rebalance=False).update(
+                ranks_need_rebalance=True,
+            )
         
     def reserve(self, user):
         """
@@ -139,6 +295,7 @@ class Item(models.Model):
         self.is_reserved = True
         self.reserved_by = user
         self.save()
+        item_reserved.send(sender=Item, instance=self, user=user)
 
     def cancel_reservation(self, user):
         """
@@ -153,7 +310,70 @@ class Item(models.Model):
         self.is_reserved = False
         self.reserved_by = None
         self.save()
+        reservation_cancelled.send(sender=Item, instance=self, user=user)
+
+    @property
+    def image_src(self):
+        """
+        URL to display the item image: the stored file, else the image proxy
+        for a remote image_url, else None.
+        """
+        if self.image:
+            return self.image.url
+        if self.image_url:
+            from .image_proxy import url_key
+            return reverse('wishlist:item_image', args=[self.pk]) + f"?v={url_key(self.image_url)[:16]}"
+        return None
 
     def __str__(self):
         """Return the title of the item."""
         return self.title
+
+
+class ItemToken(models.Model):
+    """
+    Inverted index of the words in item titles, used to match items against
+    profile interests (see wishlist.suggestions). Kept up to date when items
+    are saved; rebuilt with `python manage.py rebuild_suggestion_index`.
+    Attributes:
+        token (CharField): Normalized word of the title.
+        item (ForeignKey): Item whose title contains the word.
+    """
+    token = models.CharField(max_length=50)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='tokens')
+
+    class Meta:
+        """The unique (token, item) index doubles as the token lookup index."""
+        unique_together = ('token', 'item')
+
+    def __str__(self):
+        return f"{self.token} -> {self.item_id}"
+
+
+class PriceChange(models.Model):
+    """
+    A change of an item's price seen by the price tracker (see wishlist.prices).
+    Only changes are stored, so unchanged prices cost no rows.
+    Attributes:
+        item (ForeignKey): Item whose price changed.
+        old_price, new_price (DecimalField): Price before and after.
+        changed_at (DateTimeField): When the change was seen.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='price_changes')
+    old_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    new_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        """The history of an item is read newest first."""
+        ordering = ['-changed_at', '-pk']
+        indexes = [
+            models.Index(fields=['item', '-changed_at'], name='pricechange_item_idx'),
+        ]
+
+    @property
+    def is_drop(self):
+        return self.old_price is not None and self.new_price is not None and self.new_price < self.old_price
+
+    def __str__(self):
+        return f"{self.item_id}: {self.old_price} -> {self.new_price}"
@@ -0,0 +1,116 @@
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, Value, When
+from django.utils import timezone
+
+from .models import FriendFeedEntry, Item, PriceChange
+from .scraping import scrape_if_modified
+
+logger = logging.getLogger(__name__)
+
+
+def _due_items(now):
+    """
+    Items due for a price check, in priority order: unreserved items on
+    recently active wishlists first, then by how long they have been due.
+    """
+    cutoff = now - timedelta(days=settings.PRICE_CHECK_ACTIVE_DAYS)
+    active = FriendFeedEntry.objects.filter(wishlist_id=OuterRef('wishlist_id')).filter(
+        Q(last_activity_at__gte=cutoff) | Q(last_seen_at__gte=cutoff),
+    )
+    return (
+        Item.objects.filter(next_price_check_at__lte=now, wishlist__deleted_at__isnull=True)
+        .exclude(url_hash='')
+        .annotate(priority=Case(
+            When(Q(is_reserved=False) & Exists(active), then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        ))
+        .order_by('priority', 'next_price_check_at', 'pk')
+    )
+
+
+def schedule_untracked(now=None):
+    """Schedule items with a URL that were never scheduled (bulk-created or older rows)."""
+    return (
+        Item.objects.filter(next_price_check_at__isnull=True).exclude(url_hash='')
+        .update(next_price_check_at=now or timezone.now())
+    )
+
+
+def claim_due_items(batch_size, now=None):
+    """
+    Take the next batch_size due items off the queue.
+    Rows are locked with SKIP LOCKED and leased for PRICE_CHECK_RETRY, so
+    parallel workers get different items and a crashed run is retried.
+    Returns:
+        list: Claimed items, each with a ``priority`` of 0 (high) or 1.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        items = list(_due_items(now).select_for_update(skip_locked=True, of=('self',))[:batch_size])
+        Item.objects.filter(pk__in=[item.pk for item in items]).update(
+            next_price_check_at=now + timedelta(seconds=settings.PRICE_CHECK_RETRY),
+        )
+    return items
+
+
+def _as_price(value):
+    return None if value is None else Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+def check_price(item, now=None):
+    """
+    Re-scrape one item and reschedule it.
+    A changed price is written to the item and recorded as a PriceChange.
+    Returns:
+        str: Outcome from scraping.scrape_if_modified ('ok', 'not-modified', ...),
+        or 'stale' if the item's URL changed during the check (nothing is written).
+    """
+    now = now or timezone.now()
+    status, data, etag, last_modified = scrape_if_modified(item.url, item.etag, item.last_modified)
+    if status in ('throttled', 'error'):
+        # The claim lease already pushed the check back by PRICE_CHECK_RETRY.
+        return status
+
+    interval = settings.PRICE_CHECK_IDLE_INTERVAL if getattr(item, 'priority', 1) else settings.PRICE_CHECK_INTERVAL
+    if status == 'gone':
+        interval = settings.PRICE_CHECK_IDLE_INTERVAL
+    fields = {'etag': etag, 'last_modified': last_modified, 'next_price_check_at': now + timedelta(seconds=interval)}
+
+    price = _as_price(data.get('price'))
+    changed = price is not None and price != item.price
+    if changed:
+        fields['price'] = price
+    with transaction.atomic():
+        # The owner may have pointed the item at another product while the page
+        # was fetched; that page's data must not land on the new URL.
+        if not Item.objects.filter(pk=item.pk, url_hash=item.url_hash).update(**fields):
+            return 'stale'
+        if changed:
+            PriceChange.objects.create(item=item, old_price=item.price, new_price=price, changed_at=now)
+            item.price = price
+    return status
+
+
+def check_due_prices(batch_size=None, now=None):
+    """
+    Run one batch of price checks.
+    Returns:
+        dict: Number of items per outcome, plus 'changed' for new prices.
+    """
+    batch_size = batch_size or settings.PRICE_CHECK_BATCH
+    now = now or timezone.now()
+    schedule_untracked(now)
+    counts = {'changed': 0}
+    for item in claim_due_items(batch_size, now):
+        old_price = item.price
+        status = check_price(item, now)
+        counts[status] = counts.get(status, 0) + 1
+        if item.price != old_price:
+            counts['changed'] += 1
+    return counts
@@ -0,0 +1,92 @@
+import logging
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from .models import FriendFeedEntry, Item, Wishlist, WishlistShare
+
+logger = logging.getLogger(__name__)
+
+_purging = ContextVar('purging_wishlist', default=None)
+
+
+def is_purging(wishlist_id):
+    """True while purge_wishlist() is deleting this wishlist's items (signals skip fan-out)."""
+    return wishlist_id is not None and _purging.get() == wishlist_id
+
+
+def _delete_files(field_file_names, storage):
+    for name in field_file_names:
+        try:
+            storage.delete(name)
+        except OSError as e:
+            logger.warning("Could not delete %s: %s", name, e)
+
+
+def delete_item_images(names):
+    """
+    Delete item image files that no remaining item references.
+    Copied items share their source's file, so a name is only removed once
+    the last row pointing at it is gone.
+    """
+    names = set(names)
+    names -= set(Item.objects.filter(image__in=names).values_list('image', flat=True))
+    _delete_files(sorted(names), Item._meta.get_field('image').storage)
+
+
+def purge_wishlist(wishlist, batch_size=500):
+    """
+    Delete a soft-deleted wishlist with its items, shares, feed entries and files.
+
+    Rows go in batches of batch_size, each in its own short transaction, and
+    the image files of a batch are removed once it has committed. Safe to
+    rerun after an interruption.
+    Args:
+        wishlist (Wishlist): Wishlist with deleted_at set.
+        batch_size (int): Maximum rows deleted per transaction.
+    Returns:
+        int: Number of items deleted.
+    """
+    token = _purging.set(wishlist.pk)
+    try:
+        for related in (FriendFeedEntry, WishlistShare, Wishlist.shared_with.through):
+            while True:
+                pks = list(related.objects.filter(wishlist_id=wishlist.pk).values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+                related.objects.filter(pk__in=pks).delete()
+
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                rows = list(Item.objects.filter(wishlist_id=wishlist.pk).values_list('pk', 'image')[:batch_size])
+                if not rows:
+                    break
+                Item.objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+            delete_item_images(image for _, image in rows if image)
+            deleted += len(rows)
+    finally:
+        _purging.reset(token)
+
+    image = wishlist.image.name
+    Wishlist.all_objects.filter(pk=wishlist.pk).delete()
+    if image:
+        _delete_files([image], wishlist.image.storage)
+    logger.info("Purged wishlist %s (%s items)", wishlist.pk, deleted)
+    return deleted
+
+
+def purge_deleted_wishlists(batch_size=500, limit=None):
+    """
+    Purge every soft-deleted wishlist, oldest deletion first.
+    Returns:
+        tuple: (wishlists purged, items deleted)
+    """
+    wishlists = Wishlist.all_objects.filter(deleted_at__isnull=False).order_by('deleted_at')
+    if limit:
+        wishlists = wishlists[:limit]
+    purged = items = 0
+    for wishlist in wishlists:
+        items += purge_wishlist(wishlist, batch_size)
+        purged += 1
+    return purged, items
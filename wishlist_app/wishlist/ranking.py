@@ -0,0 +1,81 @@
+"""
+Lexicographic rank keys for ordering items without renumbering.
+
+A key is a string of base-36 digits (0-9, a-z) read as the fraction
+0.<digits>; keys never end in '0', so there is always room between two
+of them. Only lowercase letters and digits are used, so the order is the
+same under byte-wise and locale-aware database collations.
+"""
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+
+def _midpoint(a, b):
+    """Key strictly between a and b ('' is the lower bound, None the upper)."""
+    if b is not None:
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else '0') == b[n]:
+            n += 1
+        if n:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def key_between(before, after):
+    """
+    Return a key that sorts after ``before`` and before ``after``.
+    Args:
+        before (str | None): Key of the previous item, None at the start.
+        after (str | None): Key of the next item, None at the end.
+    Returns:
+        str: New key.
+    Raises:
+        ValueError: If before >= after or a key is malformed (e.g. empty).
+    """
+    for key in (before, after):
+        if key is not None and (not key or key.endswith('0') or key.strip(DIGITS)):
+            raise ValueError(f"Invalid rank key {key!r}")
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"{before!r} must sort before {after!r}")
+    if before is not None and after is None:
+        return key_after(before)
+    return _midpoint(before or '', after)
+
+
+def key_after(key):
+    """
+    Key for appending after ``key`` (None for an empty list). Bumps the first
+    digit that can be bumped, so repeated appends grow the key by one
+    character only every ~35 items instead of every few.
+    """
+    if key is None:
+        return DIGITS[BASE // 2]
+    for i, digit in enumerate(key):
+        if digit != DIGITS[-1]:
+            return key[:i] + DIGITS[DIGITS.index(digit) + 1]
+    return key + DIGITS[1]
+
+
+def spaced_keys(count):
+    """
+    ``count`` evenly spaced keys of equal, minimal length, used to rebalance
+    a list or to rank bulk-created items.
+    """
+    width = 1
+    while BASE ** width < count * 4:
+        width += 1
+    step = BASE ** width // (count + 1)
+    keys = []
+    for i in range(1, count + 1):
+        value, digits = step * i, []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        keys.append(''.join(reversed(digits)).rstrip('0'))
+    return keys
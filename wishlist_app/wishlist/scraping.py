@@ -0,0 +1,296 @@
+import asyncio
+import contextlib
+import logging
+import re
+from html import unescape
+
+import httpx
+import requests
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+
+from wishlist_app.metrics import record_http
+
+from .throttling import HostGuard
+
+logger = logging.getLogger(__name__)
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+TIMEOUT = 10
+
+OG_IMAGE_RE = re.compile(
+    rb'<meta[^>]+property=["\']og:image["\'][^>]*content=["\']([^"\']+)["\']'
+    rb'|<meta[^>]+content=["\']([^"\']+)["\'][^>]*property=["\']og:image["\']',
+    re.IGNORECASE,
+)
+HEAD_END_RE = re.compile(rb'</head\s*>', re.IGNORECASE)
+# Bytes of the previous chunks searched again, so a tag split across chunks is found.
+OG_SCAN_OVERLAP = 2048
+
+
+# BeautifulSoup tree builders the parser can run on; 'lxml' and 'html5lib'
+# are used when installed.
+PARSER_STRATEGIES = [
+    name for name in ('html.parser', 'lxml', 'html5lib')
+    if builder_registry.lookup(name) is not None
+]
+
+
+def parse_product_html(html, parser='html.parser'):
+    """
+    Extract product data from the HTML of a product page.
+    Args:
+        html (str): Page markup.
+        parser (str): BeautifulSoup tree builder, one of PARSER_STRATEGIES.
+    Returns:
+        dict: Dictionary containing 'title', 'price', and 'image_url'.
+    """
+    soup = BeautifulSoup(html, parser)
+
+    # ===== Title =====
+    title_tag = soup.find('h1')
+    if not title_tag:
+        title_tag = soup.find('h1', class_='product-title')
+    title = title_tag.get_text(strip=True) if title_tag else ''
+
+    # ===== Price =====
+    prices = []
+    for tag in soup.find_all(class_=re.compile(r'price', re.I)):
+        text = tag.get_text(strip=True)
+        match = re.search(r'([\d\s,.]+)\s*(UAH|USD|грн|₴|$)', text, re.IGNORECASE)
+        if match:
+            price_str = match.group(1).replace(' ', '').replace(',', '.')
+            try:
+                val = float(price_str)
+                if val > 0:
+                    prices.append(val)
+            except ValueError:
+                continue
+
+    if prices:
+        price = max(prices)
+    else:
+        price = None
+
+    # ===== Image =====
+    img_tag = soup.find('meta', property='og:image')
+    image_url = img_tag['content'] if img_tag else ''
+
+    return {
+        'title': title,
+        'price': price,
+        'image_url': image_url,
+    }
+
+
+def scrape_product_data(url):
+    """
+    Scrape product data from a given URL.
+    Skipped (empty result) while the host's circuit breaker is open or
+    its rate/concurrency limits are exhausted, see HostGuard.
+    Args:
+        url (str): URL of the product page.
+    Returns:
+        dict: Dictionary containing 'title', 'price', and 'image_url'.
+    """
+    guard = HostGuard.for_url(url)
+    if not guard.acquire():
+        return {}
+    healthy = False
+    try:
+        with record_http():
+            resp = requests.get(url, headers=HEADERS, timeout=TIMEOUT)
+        healthy = resp.status_code < 500
+        resp.raise_for_status()
+        data = parse_product_html(resp.text)
+        logger.debug("Scraped %s, image_url=%s", url, data['image_url'])
+        return data
+    except Exception as e:
+        logger.warning("Scrape error for %s: %s", url, e)
+        return {}
+    finally:
+        guard.release(healthy)
+
+
+def scrape_if_modified(url, etag='', last_modified=''):
+    """
+    Re-scrape a product page with a conditional request.
+    The stored validators are sent as If-None-Match / If-Modified-Since, so
+    an unchanged page costs the shop a 304 instead of a full render. Goes
+    through the host's HostGuard like scrape_product_data.
+    Args:
+        url (str): URL of the product page.
+        etag (str): ETag of the last fetched version.
+        last_modified (str): Last-Modified of the last fetched version.
+    Returns:
+        tuple: (status, data, etag, last_modified) where status is 'ok' (data
+        holds the parsed page), 'not-modified', 'gone' (404/410), 'throttled'
+        or 'error'; etag and last_modified are the new validators.
+    """
+    guard = HostGuard.for_url(url)
+    if not guard.acquire():
+        return 'throttled', {}, etag, last_modified
+    headers = dict(HEADERS)
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    healthy = False
+    try:
+        with record_http():
+            resp = requests.get(url, headers=headers, timeout=TIMEOUT)
+        healthy = resp.status_code < 500
+        if resp.status_code == 304:
+            return ('not-modified', {}, resp.headers.get('ETag', etag),
+                    resp.headers.get('Last-Modified', last_modified))
+        if resp.status_code in (404, 410):
+            return 'gone', {}, '', ''
+        resp.raise_for_status()
+        return ('ok', parse_product_html(resp.text), resp.headers.get('ETag', ''),
+                resp.headers.get('Last-Modified', ''))
+    except Exception as e:
+        logger.warning("Scrape error for %s: %s", url, e)
+        return 'error', {}, etag, last_modified
+    finally:
+        guard.release(healthy)
+
+
+async def _fetch_image(client, image_url, referer):
+    """
+    Download an image, returning its bytes or None on failure.
+    """
+    guard = HostGuard.for_url(image_url)
+    if not await guard.aacquire():
+        return None
+    healthy = False
+    try:
+        with record_http():
+            resp = await client.get(image_url, headers={"Referer": referer})
+        healthy = resp.status_code < 500
+        resp.raise_for_status()
+        return resp.content
+    except Exception as e:
+        logger.warning("Image download error for %s: %s", image_url, e)
+        return None
+    finally:
+        await guard.arelease(healthy)
+
+
+def download_image(image_url, max_bytes):
+    """
+    Download an image synchronously (used by the image proxy).
+    Args:
+        image_url (str): Absolute URL of the image.
+        max_bytes (int): Give up on images larger than this.
+    Returns:
+        bytes | None: Image data, or None on failure or when the host is throttled.
+    """
+    guard = HostGuard.for_url(image_url)
+    if not guard.acquire():
+        return None
+    healthy = False
+    try:
+        with record_http(), requests.get(image_url, headers=HEADERS, timeout=TIMEOUT, stream=True) as resp:
+            healthy = resp.status_code < 500
+            resp.raise_for_status()
+            content = bytearray()
+            for chunk in resp.iter_content(64 * 1024):
+                content += chunk
+                if len(content) > max_bytes:
+                    raise ValueError(f"image larger than {max_bytes} bytes")
+            return bytes(content)
+    except Exception as e:
+        logger.warning("Image download error for %s: %s", image_url, e)
+        return None
+    finally:
+        guard.release(healthy)
+
+
+class OgImageScanner:
+    """
+    Finds the og:image URL in a page while it is still being received.
+
+    Each chunk is searched together with the last OG_SCAN_OVERLAP bytes
+    before it rather than the whole buffer, and scanning stops at </head>,
+    so the cost stays linear in the page size. The URL is HTML-unescaped;
+    parse_product_html remains authoritative for the final value.
+    """
+    def __init__(self):
+        self.done = False
+        self._tail = b''
+
+    def feed(self, chunk):
+        """Scan the next chunk; return the og:image URL once found, else None."""
+        if self.done:
+            return None
+        window = self._tail + bytes(chunk)
+        match = OG_IMAGE_RE.search(window)
+        if match:
+            self.done = True
+            return unescape((match.group(1) or match.group(2)).decode('utf-8', 'replace'))
+        if HEAD_END_RE.search(window):
+            self.done = True
+        self._tail = window[-OG_SCAN_OVERLAP:]
+        return None
+
+
+async def ascrape_product_data(url, fetch_image=True):
+    """
+    Async counterpart of scrape_product_data that also downloads the image.
+
+    The page is streamed; as soon as the og:image tag has been received the
+    image download starts, so it overlaps with the rest of the page body.
+    If the parsed page names a different image, that one is fetched instead.
+    Both requests go through the HostGuard of their host.
+    Args:
+        url (str): URL of the product page.
+        fetch_image (bool): Download the og:image too; False only returns its URL.
+    Returns:
+        dict: 'title', 'price', 'image_url' and 'image_content' (bytes or None),
+        or an empty dict if the page could not be fetched.
+    """
+    guard = HostGuard.for_url(url)
+    if not await guard.aacquire():
+        return {}
+
+    async with httpx.AsyncClient(headers=HEADERS, timeout=TIMEOUT, follow_redirects=True) as client:
+        image_task = None
+        early_image_url = None
+        healthy = False
+        try:
+            try:
+                with record_http():
+                    async with client.stream('GET', url) as resp:
+                        healthy = resp.status_code < 500
+                        resp.raise_for_status()
+                        body = bytearray()
+                        scanner = OgImageScanner() if fetch_image else None
+                        async for chunk in resp.aiter_bytes():
+                            body += chunk
+                            if scanner and image_task is None:
+                                early_image_url = scanner.feed(chunk)
+                                if early_image_url:
+                                    image_task = asyncio.create_task(_fetch_image(client, early_image_url, url))
+                        html = bytes(body).decode(resp.encoding or 'utf-8', 'replace')
+            except httpx.TransportError:
+                healthy = False
+                raise
+            finally:
+                await guard.arelease(healthy)
+
+            data = parse_product_html(html)
+            if image_task is not None and early_image_url != data['image_url']:
+                # The early match was not the page's og:image (e.g. inside a comment).
+                image_task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await image_task
+                image_task = None
+            if fetch_image and image_task is None and data['image_url']:
+                image_task = asyncio.create_task(_fetch_image(client, data['image_url'], url))
+            data['image_content'] = await image_task if image_task else None
+            return data
+        except Exception as e:
+            if image_task is not None:
+                image_task.cancel()
+            logger.warning("Scrape error for %s: %s", url, e)
+            return {}
@@ -0,0 +1,53 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+
+from . import feed
+from .models import WishlistShare
+
+logger = logging.getLogger(__name__)
+
+
+class ShareRecorder:
+    """
+    Records that a user has opened a wishlist without writing on every view.
+
+    Pairs already known (in the cache) are ignored, so repeat views cost one
+    cache read and no queries. A new pair is written at once with
+    bulk_create(ignore_conflicts=True), together with the user's friends
+    feed entry, and only then marked as known in the cache, so a failed
+    write is retried on the next view and every worker sees the share
+    immediately.
+    """
+    @staticmethod
+    def _key(wishlist_id, user_id):
+        return f"wishlist_share:{wishlist_id}:{user_id}"
+
+    def record(self, wishlist_id, user_id):
+        """
+        Remember that user_id has opened wishlist_id.
+        Args:
+            wishlist_id (int): Primary key of the wishlist.
+            user_id (int): Primary key of the viewing user.
+        Returns:
+            bool: True if the pair was written (or already stored), False on a database error.
+        """
+        key = self._key(wishlist_id, user_id)
+        if cache.get(key):
+            return True
+        try:
+            with transaction.atomic():
+                WishlistShare.objects.bulk_create(
+                    [WishlistShare(wishlist_id=wishlist_id, shared_with_id=user_id)], ignore_conflicts=True,
+                )
+                feed.add_entries([(wishlist_id, user_id)])
+        except DatabaseError:
+            logger.exception("Failed to record wishlist share %s for user %s", wishlist_id, user_id)
+            return False
+        cache.set(key, True, timeout=settings.SHARE_CACHE_TIMEOUT)
+        return True
+
+
+share_recorder = ShareRecorder()
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import bulk, feed, live, purge, suggestions
+from .models import Item, item_reserved, reservation_cancelled
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, created, **kwargs):
+    """Fan new items out to the friends feed and live viewers, and index their titles."""
+    if created:
+        feed.item_added(instance)
+        live.publish_item_event(instance, 'item-added')
+        suggestions.index_items([instance])
+    elif kwargs.get('update_fields') is None or 'title' in kwargs['update_fields']:
+        suggestions.index_item(instance)
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+    """Fan deleted items out to the friends feed and live viewers."""
+    if purge.is_purging(instance.wishlist_id) or bulk.in_bulk_operation():
+        return
+    feed.item_removed(instance)
+    live.publish_item_event(instance, 'item-removed')
+
+
+@receiver(item_reserved, sender=Item)
+def item_was_reserved(sender, instance, **kwargs):
+    feed.reservation_changed(instance, 1)
+    live.publish_item_event(instance, 'reserved')
+
+
+@receiver(reservation_cancelled, sender=Item)
+def reservation_was_cancelled(sender, instance, **kwargs):
+    feed.reservation_changed(instance, -1)
+    live.publish_item_event(instance, 'cancelled')
@@ -0,0 +1,165 @@
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Min
+
+from accounts.models import UserProfile
+
+from .models import Item, ItemToken
+
+WORD_RE = re.compile(r'[^\W\d_]{3,}')
+
+
+def tokenize(text):
+    """
+    Normalized words of an item title or interest name: lowercase letters
+    only (emoji and digits are dropped), at least three characters, with a
+    plural 's' stripped so "books" matches "book".
+    """
+    tokens = set()
+    for word in WORD_RE.findall(text.lower()):
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.add(word[:50])
+    return tokens
+
+
+def index_item(item):
+    """Bring the item's tokens in line with its title (no writes if the title's words are unchanged)."""
+    tokens = tokenize(item.title)
+    indexed = set(ItemToken.objects.filter(item=item).values_list('token', flat=True))
+    if indexed - tokens:
+        ItemToken.objects.filter(item=item, token__in=indexed - tokens).delete()
+    if tokens - indexed:
+        ItemToken.objects.bulk_create(
+            [ItemToken(item=item, token=token) for token in tokens - indexed], ignore_conflicts=True,
+        )
+
+
+def index_items(items, batch_size=1000):
+    """Index newly created items (e.g. from bulk_create) in bulk."""
+    ItemToken.objects.bulk_create(
+        [ItemToken(item=item, token=token) for item in items for token in tokenize(item.title)],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+
+def rebuild_index(batch_size=1000):
+    """
+    Rebuild the whole index from item titles.
+    Returns:
+        int: Number of items indexed.
+    """
+    ItemToken.objects.all().delete()
+    count = 0
+    batch = []
+    for item in Item.objects.only('pk', 'title').order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            index_items(batch, batch_size)
+            count += len(batch)
+            batch = []
+    index_items(batch, batch_size)
+    return count + len(batch)
+
+
+def interest_tokens(profile):
+    """Return (liked tokens, disliked tokens) from the names of a profile's interests."""
+    liked, disliked = set(), set()
+    for name in profile.likes.values_list('name', flat=True):
+        liked |= tokenize(name)
+    for name in profile.dislikes.values_list('name', flat=True):
+        disliked |= tokenize(name)
+    return liked - disliked, disliked
+
+
+def _owner_interest_tokens(owner):
+    try:
+        profile = owner.userprofile
+    except UserProfile.DoesNotExist:
+        return set(), set()
+    return interest_tokens(profile)
+
+
+def _rank_suggestions(owner, liked, disliked, limit):
+    """
+    The expensive part of suggest_gifts(): the ranked item pks for ``own``
+    and (sample item pk, wishlist count) pairs for ``popular``.
+    """
+    matches = ItemToken.objects.filter(token__in=liked, item__wishlist__deleted_at__isnull=True)
+    if disliked:
+        matches = matches.exclude(item__in=ItemToken.objects.filter(token__in=disliked).values('item'))
+
+    own = (
+        matches.filter(item__wishlist__user=owner, item__is_reserved=False)
+        .values_list('item').annotate(score=Count('token')).order_by('-score', 'item')[:limit]
+    )
+    popular = (
+        matches.exclude(item__wishlist__user=owner)
+        .values('item__title')
+        .annotate(score=Count('token', distinct=True), count=Count('item__wishlist', distinct=True), sample=Min('item'))
+        .order_by('-score', '-count', 'item__title')[:limit]
+    )
+    return {
+        'own': [pk for pk, _ in own],
+        'popular': [(row['sample'], row['count']) for row in popular],
+    }
+
+
+def _load_suggestions(ranked):
+    """
+    Fetch the items of ranked suggestions, dropping own items reserved and
+    any item deleted (or on a deleted wishlist) since they were ranked.
+    """
+    alive = Item.objects.filter(wishlist__deleted_at__isnull=True)
+    items = alive.filter(is_reserved=False).select_related('wishlist').in_bulk(ranked['own'])
+    samples = alive.in_bulk([pk for pk, _ in ranked['popular']])
+    return {
+        'own': [items[pk] for pk in ranked['own'] if pk in items],
+        'popular': [{'item': samples[pk], 'count': count} for pk, count in ranked['popular'] if pk in samples],
+    }
+
+
+def suggest_gifts(owner, limit=None, interests=None):
+    """
+    Gift ideas for ``owner`` from their liked interests.
+
+    Matching items are looked up in the ItemToken index by the words of the
+    liked interests; items with a word of a disliked interest are left out.
+    Returns two lists, each ranked by the number of matching words:
+    ``own``: unreserved items from the owner's own wishlists;
+    ``popular``: titles from other users' wishlists, as dicts with a sample
+    ``item`` and ``count`` (on how many wishlists that title is), the more
+    wished-for first on equal match.
+    Interests are tokenized here rather than indexed, so profile edits
+    apply at once; only item titles need the precomputed index.
+    ``interests`` takes (liked, disliked) tokens already read from the profile.
+    """
+    liked, disliked = interests or _owner_interest_tokens(owner)
+    if not liked:
+        return {'own': [], 'popular': []}
+    return _load_suggestions(_rank_suggestions(owner, liked, disliked, limit or settings.SUGGESTION_LIMIT))
+
+
+def cached_suggest_gifts(owner):
+    """
+    suggest_gifts() for public_wishlist with the ranking cached per owner
+    for SUGGESTION_CACHE_TIMEOUT seconds. Only item pks and counts are
+    cached; the items are fetched on every call, so reservations and
+    deletions show at once. The interest words are part of the key, so
+    profile edits apply at once too; the site-wide GROUP BY runs at most
+    once per timeout and owner.
+    """
+    liked, disliked = _owner_interest_tokens(owner)
+    if not liked:
+        return {'own': [], 'popular': []}
+    words = ' '.join(sorted(liked)) + '|' + ' '.join(sorted(disliked))
+    key = f"gift-ideas:{owner.pk}:{hashlib.md5(words.encode('utf-8')).hexdigest()}"
+    ranked = cache.get(key)
+    if ranked is None:
+        ranked = _rank_suggestions(owner, liked, disliked, settings.SUGGESTION_LIMIT)
+        cache.set(key, ranked, settings.SUGGESTION_CACHE_TIMEOUT)
+    return _load_suggestions(ranked)
@@ -1,12 +1,44 @@
-from django.test import TestCase, Client
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from django.core.management import call_command
+from django.core.handlers.asgi import ASGIHandler
+from django.db import DatabaseError, connections
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse, resolve
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
-from .models import Wishlist, Item
-from accounts.models import UserProfile
+from .models import FriendFeedEntry, Wishlist, Item, ItemToken, PriceChange, WishlistShare
+from accounts.models import Interest, OutboxEmail, UserProfile
+from .fakeshop import CORPUS_FIELDS, CorpusServer, FakeShopServer, field_matches, load_corpus
+from .scraping import OgImageScanner, ascrape_product_data, scrape_product_data
+from . import birthdays, feed, live, prices, suggestions
+from .canonical import canonicalize_url, reusable_product_data, url_hash
+from .image_proxy import ImageCache
+from .shares import share_recorder
+from .throttling import HostGuard
 from .views import wishlist_list, wishlist_detail, item_detail
 from accounts.views import profile_view, create_profile
 from accounts.models import CustomUser
+from wishlist_app.images import normalize_image
+from wishlist_app.metrics import HISTOGRAMS
+from wishlist_app.static import StaticFilesWSGI
+from wishlist_app.routers import PIN_COOKIE_NAME, PrimaryReplicaRouter, RoutingState, _routing_state
 
 
 class ModelTests(TestCase):
@@ -83,4 +115,1176 @@ class URLTests(TestCase):
         self.assertEqual(resolve("/wishlist/all/").func, wishlist_list)
         self.assertEqual(resolve("/wishlist/1/").func, wishlist_detail)
         self.assertEqual(resolve("/accounts/profile/1/").func, profile_view)
-        self.assertEqual(resolve("/accounts/create_profile/").func, create_profile)
\ No newline at end of file
+        self.assertEqual(resolve("/accounts/create_profile/").func, create_profile)
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {'default', 'replica1'} if 'replica1' in settings.DATABASES else {'default'}
+
+    def setUp(self):
+        self.client = Client()
+        self.user = CustomUser.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass"
+        )
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_outside_request_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Wishlist), 'default')
+
+    def test_reads_use_replica_until_write(self):
+        token = _routing_state.set(RoutingState())
+        try:
+            self.assertEqual(self.router.db_for_read(Wishlist), 'replica1')
+            self.assertEqual(self.router.db_for_write(Wishlist), 'default')
+            self.assertEqual(self.router.db_for_read(Wishlist), 'default')
+        finally:
+            _routing_state.reset(token)
+
+    def test_post_pins_following_reads_to_primary(self):
+        self.client.login(email="test@example.com", password="testpass")
+        response = self.client.post(reverse("wishlist:wishlist_create"), {'name': 'Games'})
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE_NAME]['max-age'], settings.REPLICA_PIN_SECONDS)
+
+        response = self.client.get(reverse("wishlist:wishlist_list"))
+        self.assertContains(response, "Games")
+
+    @skipUnless('replica1' in settings.DATABASES, "requires a 'replica1' database")
+    def test_read_only_view_reads_from_replica(self):
+        self.client.force_login(self.user)
+        self.client.cookies.pop(PIN_COOKIE_NAME, None)
+        with CaptureQueriesContext(connections['replica1']) as replica_queries:
+            response = self.client.get(reverse("wishlist:friends_wishlists"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica_queries.captured_queries)
+
+
+class AsyncScrapeViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass"
+        )
+        self.wishlist = Wishlist.objects.create(name="Books", user=self.user)
+
+    @override_settings(SCRAPE_IMAGE_MODE='eager')
+    async def test_item_create_scrapes_page_and_image(self):
+        await self.async_client.aforce_login(self.user)
+        with FakeShopServer() as shop:
+            response = await self.async_client.post(
+                reverse("wishlist:item_create", args=[self.wishlist.pk]),
+                {'title': 'Placeholder', 'url': shop.product_url(7)},
+            )
+        self.assertEqual(response.status_code, 302)
+        item = await Item.objects.aget(wishlist=self.wishlist)
+        self.assertEqual(item.title, "Fake product 7")
+        self.assertEqual(item.price, 101)
+        self.assertTrue(item.image)
+        item.image.delete(save=False)
+
+    @override_settings(SCRAPE_IMAGE_MODE='eager')
+    async def test_early_image_url_is_unescaped(self):
+        with FakeShopServer() as shop:
+            shop.image_query = '?v=1&amp;s=64'
+            data = await ascrape_product_data(shop.product_url(7))
+        self.assertTrue(data['image_content'])
+        self.assertEqual(shop.image_paths, ['/images/7.png?v=1&s=64'])
+
+    def test_og_image_scanner(self):
+        scanner = OgImageScanner()
+        self.assertIsNone(scanner.feed(b'<html><head><meta property="og:im'))
+        self.assertEqual(scanner.feed(b'age" content="/a.png?x=1&amp;y=2"></head>'), '/a.png?x=1&y=2')
+
+        scanner = OgImageScanner()
+        self.assertIsNone(scanner.feed(b'<head><title>T</title></head><body>'))
+        self.assertTrue(scanner.done)
+        self.assertIsNone(scanner.feed(b'<meta property="og:image" content="/late.png">'))
+
+    async def test_item_create_without_shop_keeps_user_data(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(
+            reverse("wishlist:item_create", args=[self.wishlist.pk]),
+            {'title': 'Kettle', 'url': 'http://127.0.0.1:9/missing'},
+        )
+        self.assertEqual(response.status_code, 302)
+        item = await Item.objects.aget(wishlist=self.wishlist)
+        self.assertEqual(item.title, "Kettle")
+        self.assertFalse(item.image)
+
+
+class ShareRecorderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = CustomUser.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.friend = CustomUser.objects.create_user(username="friend", email="friend@example.com", password="pass")
+        self.wishlist = Wishlist.objects.create(name="Books", user=self.owner)
+        self.client.force_login(self.friend)
+
+    def test_repeat_views_do_not_write(self):
+        url = self.wishlist.get_absolute_url()
+        self.client.get(url)
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.client.get(url)
+        self.assertFalse([q for q in queries.captured_queries if 'wishlist_wishlistshare' in q['sql']])
+
+    def test_view_recorded_at_once(self):
+        self.client.get(self.wishlist.get_absolute_url())
+        self.assertTrue(WishlistShare.objects.filter(wishlist=self.wishlist, shared_with=self.friend).exists())
+        response = self.client.get(reverse("wishlist:friends_wishlists"))
+        self.assertContains(response, "Books")
+
+    def test_existing_share_skipped(self):
+        WishlistShare.objects.create(wishlist=self.wishlist, shared_with=self.friend)
+        self.assertTrue(share_recorder.record(self.wishlist.pk, self.friend.pk))
+        self.assertEqual(WishlistShare.objects.count(), 1)
+
+    def test_failed_write_not_cached(self):
+        with mock.patch.object(WishlistShare.objects, 'bulk_create', side_effect=DatabaseError), \
+                self.assertLogs('wishlist.shares', 'ERROR'):
+            self.assertFalse(share_recorder.record(self.wishlist.pk, self.friend.pk))
+        self.assertTrue(share_recorder.record(self.wishlist.pk, self.friend.pk))
+        self.assertTrue(WishlistShare.objects.filter(wishlist=self.wishlist, shared_with=self.friend).exists())
+
+    def test_owner_view_not_recorded(self):
+        self.client.force_login(self.owner)
+        self.client.get(self.wishlist.get_absolute_url())
+        self.assertFalse(WishlistShare.objects.exists())
+
+
+class FriendsFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = CustomUser.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.friend = CustomUser.objects.create_user(username="friend", email="friend@example.com", password="pass")
+        self.wishlist = Wishlist.objects.create(name="Books", user=self.owner)
+        Item.objects.create(wishlist=self.wishlist, title="Old book")
+        self.client.force_login(self.friend)
+        self.client.get(self.wishlist.get_absolute_url())
+
+    def entry(self):
+        return FriendFeedEntry.objects.get(user=self.friend, wishlist=self.wishlist)
+
+    def test_share_creates_entry_with_counts(self):
+        entry = self.entry()
+        self.assertEqual((entry.item_count, entry.reserved_count, entry.new_items), (1, 0, 0))
+
+    def test_items_and_reservations_fan_out(self):
+        before = self.entry().last_activity_at
+        item = Item.objects.create(wishlist=self.wishlist, title="New book")
+        Item.objects.create(wishlist=self.wishlist, title="Lamp")
+        self.assertEqual((self.entry().item_count, self.entry().new_items), (3, 2))
+        self.assertGreater(self.entry().last_activity_at, before)
+
+        item.reserve(self.friend)
+        self.assertEqual(self.entry().reserved_count, 1)
+        item.cancel_reservation(self.friend)
+        self.assertEqual(self.entry().reserved_count, 0)
+
+        item.delete()
+        self.assertEqual(self.entry().item_count, 2)
+
+    def test_visit_resets_new_items(self):
+        Item.objects.create(wishlist=self.wishlist, title="New book")
+        response = self.client.get(reverse("wishlist:friends_wishlists"))
+        self.assertContains(response, "1 new item since your last visit")
+
+        self.client.get(self.wishlist.get_absolute_url())
+        self.assertEqual(self.entry().new_items, 0)
+        self.assertIsNotNone(self.entry().last_seen_at)
+
+    def test_repeat_visit_does_not_write(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(self.wishlist.get_absolute_url())
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')])
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_friends_page_is_one_query(self):
+        other_owner = CustomUser.objects.create_user(username="other", email="other@example.com", password="pass")
+        for n in range(3):
+            wishlist = Wishlist.objects.create(name=f"List {n}", user=other_owner)
+            self.client.get(wishlist.get_absolute_url())
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(reverse("wishlist:friends_wishlists"))
+        self.assertContains(response, "Owned by", count=4)
+        feed_queries = [q for q in queries.captured_queries if 'friendfeedentry' in q['sql']]
+        self.assertEqual(len(feed_queries), 1)
+        self.assertFalse([q for q in queries.captured_queries if 'wishlist_wishlistshare' in q['sql']])
+
+    def test_rebuild_command(self):
+        FriendFeedEntry.objects.all().delete()
+        call_command('rebuild_friends_feed', stdout=StringIO())
+        self.assertEqual(self.entry().item_count, 1)
+
+    def test_rebuild_skips_soft_deleted_wishlists(self):
+        self.wishlist.soft_delete()
+        self.assertEqual(feed.rebuild(), 0)
+        self.assertFalse(FriendFeedEntry.objects.exists())
+        self.assertEqual(feed._add_backfilled([(self.wishlist.pk, self.friend.pk, timezone.now())]), 0)
+
+
+class LiveUpdatesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = CustomUser.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.friend = CustomUser.objects.create_user(username="friend", email="friend@example.com", password="pass")
+        self.wishlist = Wishlist.objects.create(name="Books", user=self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item = Item.objects.create(wishlist=self.wishlist, title="Novel")
+            self.item.reserve(self.friend)
+
+    def test_item_changes_published(self):
+        events = live.events_since(self.wishlist.pk, 0)
+        self.assertEqual([event for _, event, _ in events], ['item-added', 'reserved'])
+        self.assertIn(f'data-item-id="{self.item.pk}"', events[0][2]['html'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.cancel_reservation(self.friend)
+            self.item.delete()
+        events = live.events_since(self.wishlist.pk, 2)
+        self.assertEqual([(seq, event) for seq, event, _ in events], [(3, 'cancelled'), (4, 'item-removed')])
+
+    @override_settings(LIVE_STREAM_MAX_SECONDS=0.2, LIVE_POLL_INTERVAL=0.05)
+    async def test_event_stream_resumes_from_last_event_id(self):
+        await self.async_client.aforce_login(self.friend)
+        response = await self.async_client.get(
+            reverse("wishlist:wishlist_events", args=[self.wishlist.pk]),
+            headers={'Last-Event-ID': '1'},
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn(f'id: 2\nevent: reserved\ndata: {{"item": {self.item.pk}', body)
+        self.assertNotIn('item-added', body)
+
+    @override_settings(LIVE_STREAM_MAX_SECONDS=0.2, LIVE_POLL_INTERVAL=0.05)
+    async def test_owner_stream_gets_owner_cards(self):
+        await self.async_client.aforce_login(self.owner)
+        response = await self.async_client.get(
+            reverse("wishlist:wishlist_events", args=[self.wishlist.pk]),
+            headers={'Last-Event-ID': '0'},
+        )
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn(reverse("wishlist:item_delete", args=[self.item.pk]), body)
+
+        await self.async_client.aforce_login(self.friend)
+        response = await self.async_client.get(
+            reverse("wishlist:wishlist_events", args=[self.wishlist.pk]),
+            headers={'Last-Event-ID': '0'},
+        )
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn(f'data-item-id=\\"{self.item.pk}\\"', body)
+        self.assertNotIn(reverse("wishlist:item_delete", args=[self.item.pk]), body)
+
+    def test_deleted_wishlist_not_streamed(self):
+        self.wishlist.soft_delete()
+        self.client.force_login(self.friend)
+        response = self.client.get(reverse("wishlist:wishlist_events", args=[self.wishlist.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(LIVE_POLL_INTERVAL=10)
+    async def test_local_subscribers_woken_on_publish(self):
+        async def first_event():
+            async for seq, event, data in live.subscribe(self.wishlist.pk):
+                if event:
+                    return event
+
+        task = asyncio.create_task(first_event())
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        threading.Thread(target=live.publish, args=(self.wishlist.pk, 'reserved', {})).start()
+        self.assertEqual(await asyncio.wait_for(task, 2), 'reserved')
+        self.assertLess(time.monotonic() - started, 1)
+
+
+class WishlistPurgeTests(TestCase):
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        self.owner = CustomUser.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.friend = CustomUser.objects.create_user(username="friend", email="friend@example.com", password="pass")
+        self.wishlist = Wishlist.objects.create(name="Books", user=self.owner)
+        self.items = [Item.objects.create(wishlist=self.wishlist, title=f"Book {n}") for n in range(5)]
+        self.items[0].image.save("cover.png", ContentFile(b"png"))
+        WishlistShare.objects.create(wishlist=self.wishlist, shared_with=self.friend)
+        FriendFeedEntry.objects.create(wishlist=self.wishlist, user=self.friend)
+        self.client.force_login(self.owner)
+
+    def test_delete_hides_wishlist_immediately(self):
+        response = self.client.post(reverse("wishlist:wishlist_delete", args=[self.wishlist.pk]))
+        self.assertRedirects(response, reverse("wishlist:wishlist_list"))
+        self.assertEqual(Item.objects.count(), 5)
+        self.assertFalse(Wishlist.objects.exists())
+        self.assertEqual(self.client.get(self.wishlist.get_absolute_url()).status_code, 404)
+        self.assertEqual(self.client.get(reverse("wishlist:item_detail", args=[self.items[1].pk])).status_code, 404)
+
+        self.client.force_login(self.friend)
+        response = self.client.get(reverse("wishlist:friends_wishlists"))
+        self.assertNotContains(response, "Books")
+
+    def test_purge_removes_rows_and_files_in_batches(self):
+        path = self.items[0].image.path
+        self.assertTrue(os.path.exists(path))
+        self.wishlist.soft_delete()
+
+        out = StringIO()
+        with CaptureQueriesContext(connections['default']) as queries:
+            call_command('purge_deleted_wishlists', '--batch-size', '2', stdout=out)
+        self.assertIn("Purged 1 wishlist(s) with 5 item(s).", out.getvalue())
+        self.assertFalse(Wishlist.all_objects.exists())
+        self.assertFalse(Item.objects.exists())
+        self.assertFalse(WishlistShare.objects.exists())
+        self.assertFalse(FriendFeedEntry.objects.exists())
+        self.assertFalse(os.path.exists(path))
+        item_deletes = [q for q in queries.captured_queries if q['sql'].startswith('DELETE FROM "wishlist_item"')]
+        self.assertEqual(len(item_deletes), 3)
+
+    def test_new_wishlist_does_not_reuse_deleted_code(self):
+        self.wishlist.soft_delete()
+        other = Wishlist.objects.create(name="Games", user=self.owner)
+        self.assertNotEqual(other.code, self.wishlist.code)
+
+
+class MediaGarbageCollectorTests(TestCase):
+    def setUp(self):
+        self.media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media))
+        owner = CustomUser.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        wishlist = Wishlist.objects.create(name="Books", user=owner)
+        self.item = Item.objects.create(wishlist=wishlist, title="Book")
+        self.item.image.save("kept.png", ContentFile(b"png"))
+        wishlist.image.save("cover.png", ContentFile(b"png"))
+        wishlist.soft_delete()
+        self.orphans = []
+        for name in ("images/items/orphan.png", "images/profile/orphan.png", "wishlist_images/old/orphan.png"):
+            path = os.path.join(self.media, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(b"png")
+            os.utime(path, (time.time() - 3 * 86400,) * 2)
+            self.orphans.append(path)
+        os.utime(self.item.image.path, (time.time() - 3 * 86400,) * 2)
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command('gc_media', '--rate', '0', '--batch-size', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_lists_orphans_only(self):
+        output = self.gc('--dry-run')
+        self.assertIn("Found 3 orphaned file(s)", output)
+        self.assertIn("images/items/orphan.png", output)
+        self.assertTrue(all(os.path.exists(path) for path in self.orphans))
+
+    def test_deletes_old_orphans_and_keeps_referenced(self):
+        recent = os.path.join(self.media, "images/items/uploading.png")
+        with open(recent, "wb") as f:
+            f.write(b"png")
+        self.assertIn("Deleted 3 orphaned file(s)", self.gc())
+        self.assertFalse(any(os.path.exists(path) for path in self.orphans))
+        self.assertTrue(os.path.exists(recent))
+        self.assertTrue(os.path.exists(self.item.image.path))
+        self.assertTrue(Wishlist.all_objects.get().image.storage.exists(Wishlist.all_objects.get().image.name))
+
+
+def make_photo(size=(4000, 3000), orientation=6):
+    """A JPEG 'phone photo' with EXIF orientation and GPS-like metadata."""
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    exif[0x010F] = "PhoneMaker"
+    buffer = BytesIO()
+    Image.new('RGB', size, (10, 120, 200)).save(buffer, 'JPEG', exif=exif.tobytes(), quality=95)
+    return buffer.getvalue()
+
+
+@override_settings(IMAGE_MAX_DIMENSION=800)
+class ImageNormalizationTests(TestCase):
+    def test_downscales_rotates_and_strips_metadata(self):
+        result = normalize_image(make_photo(), 'IMG_0001.JPG')
+        self.assertTrue(result.name.startswith('IMG_0001.'))
+        self.assertNotIn('.JPG', result.name)
+        with Image.open(BytesIO(result.read())) as image:
+            self.assertEqual(image.size, (600, 800))  # rotated by the EXIF orientation
+            self.assertFalse(image.getexif())
+
+    def test_keeps_transparency(self):
+        buffer = BytesIO()
+        Image.new('RGBA', (50, 50), (0, 0, 0, 0)).save(buffer, 'PNG')
+        with Image.open(normalize_image(buffer.getvalue(), 'logo.png')) as image:
+            self.assertEqual(image.mode, 'RGBA')
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_rejects_invalid_and_huge_images(self):
+        with self.assertRaises(ValidationError):
+            normalize_image(b"not an image")
+        with self.assertRaises(ValidationError):
+            normalize_image(make_photo((20, 20)))
+
+    def test_uploaded_item_image_is_normalized(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        user = CustomUser.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        wishlist = Wishlist.objects.create(name="Books", user=user)
+        self.client.force_login(user)
+        upload = SimpleUploadedFile('photo.jpg', make_photo(), content_type='image/jpeg')
+        self.client.post(reverse("wishlist:item_create", args=[wishlist.pk]), {'title': 'Lamp', 'image': upload})
+        item = Item.objects.get(wishlist=wishlist)
+        self.assertFalse(item.image.name.endswith('.jpg'))
+        with Image.open(item.image.path) as image:
+            self.assertLessEqual(max(image.size), 800)
+        self.assertLess(item.image.size, len(make_photo()))
+
+
+@override_settings(SCRAPE_IMAGE_MODE='lazy')
+class ImageProxyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(IMAGE_PROXY_CACHE_DIR=self.cache_dir))
+        self.user = CustomUser.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.wishlist = Wishlist.objects.create(name="Books", user=self.user)
+        self.shop = self.enterContext(FakeShopServer())
+        self.client.force_login(self.user)
+
+    def test_lazy_item_fetches_image_on_first_view_only(self):
+        self.client.post(
+            reverse("wishlist:item_create", args=[self.wishlist.pk]),
+            {'title': 'Placeholder', 'url': self.shop.product_url(7)},
+        )
+        item = Item.objects.get(wishlist=self.wishlist)
+        self.assertFalse(item.image)
+        self.assertTrue(item.image_url.endswith('/images/7.png'))
+        self.assertEqual(self.shop.requests_served, 1)
+
+        response = self.client.get(item.image_src)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'RIFF'))
+        self.assertEqual(self.shop.requests_served, 2)
+
+        response = self.client.get(item.image_src)
+        self.assertEqual(response.status_code, 200)
+        b''.join(response.streaming_content)
+        self.assertEqual(self.shop.requests_served, 2)
+
+    def test_unavailable_image_redirects_to_placeholder(self):
+        item = Item.objects.create(wishlist=self.wishlist, title="Lamp", image_url=self.shop.base_url + "/missing.png")
+        response = self.client.get(reverse("wishlist:item_image", args=[item.pk]))
+        self.assertRedirects(response, "/static/images/default-gift.png", fetch_redirect_response=False)
+
+    def test_cache_evicts_least_recently_used(self):
+        image_cache = ImageCache(self.cache_dir, max_bytes=250)
+        image_cache.put('aa1', b'x' * 100)
+        image_cache.put('bb2', b'x' * 100)
+        os.utime(image_cache._path('aa1'), (1, 1))
+        os.utime(image_cache._path('bb2'), (2, 2))
+        self.assertIsNotNone(image_cache.get('aa1'))  # refreshes aa1
+        image_cache.put('cc3', b'x' * 100)
+        self.assertIsNone(image_cache.get('bb2'))
+        self.assertIsNotNone(image_cache.get('aa1'))
+        self.assertIsNotNone(image_cache.get('cc3'))
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        self.user = CustomUser.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.wishlist = Wishlist.objects.create(name="Books", user=self.user)
+        self.item = Item.objects.create(wishlist=self.wishlist, title="Book")
+        self.item.image.save("cover.webp", ContentFile(b"0123456789"))
+        self.url = self.item.image.url
+
+    def test_serves_referenced_file_with_immutable_caching(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b"0123456789")
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+
+        response = self.client.get(self.url, headers={'If-Modified-Since': response['Last-Modified']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, headers={'Range': 'bytes=2-5'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b"2345")
+
+        response = self.client.get(self.url, headers={'Range': 'bytes=-3'})
+        self.assertEqual(b''.join(response.streaming_content), b"789")
+
+        response = self.client.get(self.url, headers={'Range': 'bytes=20-'})
+        self.assertEqual(response.status_code, 416)
+
+    @override_settings(MEDIA_ACCEL='nginx')
+    def test_hands_off_to_nginx(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.item.image.name)
+        self.assertEqual(response.content, b'')
+
+    def test_hidden_and_unreferenced_files_are_404(self):
+        self.assertEqual(self.client.get('/media/images/items/unknown.webp').status_code, 404)
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+        self.wishlist.soft_delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_profile_pictures_need_login(self):
+        profile = UserProfile.objects.create(user=self.user)
+        profile.profile_pic.save("me.webp", ContentFile(b"me"))
+        self.assertEqual(self.client.get(profile.profile_pic.url).status_code, 404)
+        self.client.force_login(self.user)
+        response = self.client.get(profile.profile_pic.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+
+class StaticPipelineTests(TestCase):
+    def test_collectstatic_hashes_compresses_and_optimizes(self):
+        static_root = self.enterContext(tempfile.TemporaryDirectory())
+        with override_settings(STATIC_ROOT=static_root):
+            call_command('collectstatic', '--noinput', verbosity=0)
+            manifest = json.loads(open(os.path.join(static_root, 'staticfiles.json')).read())['paths']
+
+        css = manifest['styles.css']
+        self.assertNotEqual(css, 'styles.css')
+        self.assertTrue(os.path.exists(os.path.join(static_root, css + '.gz')))
+        self.assertTrue(os.path.exists(os.path.join(static_root, css + '.br')))
+
+        gift = manifest['images/default-gift.png']
+        source = os.path.join(settings.BASE_DIR, 'static', 'images', 'default-gift.png')
+        self.assertLessEqual(os.path.getsize(os.path.join(static_root, gift)), os.path.getsize(source))
+        self.assertFalse(os.path.exists(os.path.join(static_root, gift + '.gz')))
+
+    def test_asgi_middleware_chain_needs_no_adaptation(self):
+        with override_settings(DEBUG=True), self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+
+    def test_wsgi_entry_point_serves_hashed_files_immutable(self):
+        static_root = self.enterContext(tempfile.TemporaryDirectory())
+        with override_settings(STATIC_ROOT=static_root, DEBUG=False):
+            call_command('collectstatic', '--noinput', verbosity=0)
+            css = json.loads(open(os.path.join(static_root, 'staticfiles.json')).read())['paths']['styles.css']
+            app = StaticFilesWSGI(lambda environ, start_response: self.fail("not served statically"))
+            environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': f'/static/{css}', 'HTTP_ACCEPT_ENCODING': 'br'}
+            started = {}
+            body = b''.join(app(environ, lambda status, headers: started.update(status=status, headers=dict(headers))))
+        self.assertEqual(started['status'], '200 OK')
+        self.assertIn('immutable', started['headers']['Cache-Control'])
+        self.assertEqual(started['headers']['Content-Encoding'], 'br')
+        self.assertTrue(body)
+
+    def test_uncollected_assets_fall_back_to_plain_names(self):
+        response = self.client.get(reverse('accounts:login'))
+        self.assertContains(response, '/static/styles.css')
+
+
+class ItemRankingTests(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.wishlist = Wishlist.objects.create(name="Books", user=self.owner)
+        self.items = [Item.objects.create(wishlist=self.wishlist, title=f"Book {n}") for n in range(4)]
+        self.client.force_login(self.owner)
+
+    def titles(self):
+        return list(self.wishlist.items.values_list('title', flat=True))
+
+    def move(self, item, before=None, after=None):
+        data = {k: v.pk for k, v in (('before', before), ('after', after)) if v}
+        return self.client.post(reverse('wishlist:item_move', args=[item.pk]), data)
+
+    def test_new_items_are_appended(self):
+        self.assertEqual(self.titles(), ["Book 0", "Book 1", "Book 2", "Book 3"])
+
+    def test_move_updates_only_the_moved_row(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.move(self.items[3], before=self.items[0], after=self.items[1])
+        self.assertEqual(response.status_code, 200)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "wishlist_item"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.titles(), ["Book 0", "Book 3", "Book 1", "Book 2"])
+
+        self.move(self.items[0], before=self.items[2])
+        self.move(self.items[2], after=self.items[3])
+        self.assertEqual(self.titles(), ["Book 2", "Book 3", "Book 1", "Book 0"])
+
+    def test_only_owner_can_move(self):
+        other = CustomUser.objects.create_user(username="other", email="other@example.com", password="pass")
+        self.client.force_login(other)
+        self.assertEqual(self.move(self.items[3], after=self.items[0]).status_code, 403)
+        self.assertEqual(self.client.get(reverse('wishlist:item_move', args=[self.items[0].pk])).status_code, 405)
+
+    @override_settings(RANK_MAX_LENGTH=4)
+    def test_long_keys_are_rebalanced_in_background(self):
+        # Keep dropping items right after the first one, halving the same gap.
+        for n in range(20):
+            moved = self.items[2 + n % 2]
+            self.move(moved, before=self.items[0], after=self.wishlist.items.all()[1])
+        self.wishlist.refresh_from_db()
+        self.assertTrue(self.wishlist.ranks_need_rebalance)
+        order = self.titles()
+
+        out = StringIO()
+        call_command('rebalance_item_ranks', stdout=out)
+        self.assertIn("Rebalanced 1 wishlist(s).", out.getvalue())
+        self.wishlist.refresh_from_db()
+        self.assertFalse(self.wishlist.ranks_need_rebalance)
+        self.assertEqual(self.titles(), order)
+        self.assertTrue(all(len(rank) == 1 for rank in self.wishlist.items.values_list('rank', flat=True)))
+
+    def test_unranked_neighbours_trigger_rebalance(self):
+        Item.objects.bulk_create([Item(wishlist=self.wishlist, title="Imported")])
+        imported = Item.objects.get(title="Imported")
+        self.assertEqual(self.move(self.items[0], before=imported).status_code, 200)
+        self.assertEqual(self.titles(), ["Book 1", "Book 2", "Book 3", "Imported", "Book 0"])
+
+    def test_ordered_grid_reads_the_rank_index(self):
+        plan = self.wishlist.items.all().explain()
+        self.assertIn('item_wishlist_rank_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class BulkItemOperationsTests(TestCase):
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        self.owner = CustomUser.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.friend = CustomUser.objects.create_user(username="friend", email="friend@example.com", password="pass")
+        self.source = Wishlist.objects.create(name="Books", user=self.owner)
+        self.target = Wishlist.objects.create(name="Games", user=self.owner)
+        self.items = [Item.objects.create(wishlist=self.source, title=f"Item {n}") for n in range(4)]
+        self.items[0].image.save("cover.png", ContentFile(b"png"))
+        Item.objects.create(wishlist=self.target, title="Chess")
+        for wishlist in (self.source, self.target):
+            FriendFeedEntry.objects.create(wishlist=wishlist, user=self.friend, item_count=wishlist.items.count())
+        self.client.force_login(self.owner)
+
+    def bulk(self, action, items, target=None):
+        data = {'action': action, 'items': [item.pk for item in items]}
+        if target:
+            data['target'] = target.pk
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.post(reverse('wishlist:wishlist_items_bulk', args=[self.source.pk]), data)
+        # Read the log now: Django resets it when the next request starts.
+        captured = queries.captured_queries
+        self.assertRedirects(response, reverse('wishlist:wishlist_detail', args=[self.source.pk]))
+        return captured
+
+    def writes(self, queries, verb):
+        return [q['sql'] for q in queries if q['sql'].startswith(f'{verb} "wishlist_item"')]
+
+    def feed_counts(self):
+        return dict(FriendFeedEntry.objects.values_list('wishlist__name', 'item_count'))
+
+    def test_move_is_one_update(self):
+        queries = self.bulk('move', self.items[:3], self.target)
+        self.assertEqual(len(self.writes(queries, 'UPDATE')), 1)
+        self.assertEqual(list(self.target.items.values_list('title', flat=True)), ["Chess", "Item 0", "Item 1", "Item 2"])
+        self.assertEqual(list(self.source.items.values_list('title', flat=True)), ["Item 3"])
+        self.assertEqual(self.feed_counts(), {"Books": 1, "Games": 4})
+
+    def test_copy_shares_image_files(self):
+        queries = self.bulk('copy', self.items[:2], self.target)
+        self.assertEqual(len(self.writes(queries, 'INSERT INTO')), 1)
+        copy = self.target.items.get(title="Item 0")
+        self.assertEqual(copy.image.name, self.items[0].image.name)
+        self.assertEqual(self.source.items.count(), 4)
+        self.assertEqual(self.feed_counts(), {"Books": 4, "Games": 3})
+
+        path = self.items[0].image.path
+        self.bulk('delete', [self.items[0]])
+        self.assertTrue(os.path.exists(path))
+        self.target.soft_delete()
+        call_command('purge_deleted_wishlists', stdout=StringIO())
+        self.assertFalse(os.path.exists(path))
+
+    def test_delete_is_one_batched_delete_and_cleans_files(self):
+        path = self.items[0].image.path
+        with self.captureOnCommitCallbacks(execute=True):
+            queries = self.bulk('delete', self.items[:3])
+        self.assertEqual(len(self.writes(queries, 'DELETE FROM')), 1)
+        self.assertEqual(list(self.source.items.values_list('title', flat=True)), ["Item 3"])
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.feed_counts(), {"Books": 1, "Games": 1})
+
+    def test_cannot_touch_other_users_items(self):
+        other = Wishlist.objects.create(name="Other", user=self.friend)
+        foreign = Item.objects.create(wishlist=other, title="Foreign")
+        self.bulk('move', [foreign], self.target)
+        self.bulk('copy', self.items[:1], other)
+        self.assertEqual(list(other.items.all()), [foreign])
+        self.client.force_login(self.friend)
+        response = self.client.post(reverse('wishlist:wishlist_items_bulk', args=[self.source.pk]),
+                                    {'action': 'delete', 'items': [self.items[1].pk]})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.source.items.count(), 4)
+
+
+class ReservedGiftsTests(TestCase):
+    def setUp(self):
+        self.me = CustomUser.objects.create_user(username="me", email="me@example.com", password="pass")
+        self.anna = CustomUser.objects.create_user(username="anna", email="anna@example.com", password="pass")
+        self.bob = CustomUser.objects.create_user(username="bob", email="bob@example.com", password="pass")
+        for owner, prices in ((self.anna, [100, 250, None]), (self.bob, [40])):
+            for n, wishlist_name in enumerate(["Birthday", "Xmas"]):
+                wishlist = Wishlist.objects.create(name=wishlist_name, user=owner)
+                for price in prices[n::2]:
+                    Item.objects.create(wishlist=wishlist, title=f"{owner.username} {price}", price=price).reserve(self.me)
+        Item.objects.create(wishlist=wishlist, title="Not mine")
+        self.client.force_login(self.me)
+
+    def test_grouped_by_owner_from_one_query(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(reverse('wishlist:reserved_gifts'))
+        item_queries = [q for q in queries.captured_queries if '"wishlist_item"' in q['sql']]
+        self.assertEqual(len(item_queries), 1)
+
+        groups = response.context['groups']
+        self.assertEqual([group['owner'] for group in groups], [self.anna, self.bob])
+        self.assertEqual([(group['count'], group['spend']) for group in groups], [(3, 350), (1, 40)])
+        self.assertEqual((response.context['total_count'], response.context['total_spend']), (4, 390))
+        self.assertNotContains(response, "Not mine")
+
+    def test_deleted_wishlists_are_hidden(self):
+        for wishlist in Wishlist.objects.filter(user=self.bob):
+            wishlist.soft_delete()
+        response = self.client.get(reverse('wishlist:reserved_gifts'))
+        self.assertEqual([group['owner'] for group in response.context['groups']], [self.anna])
+
+
+class BirthdayReminderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = CustomUser.objects.create_user(username="me", email="me@example.com", password="pass")
+        self.other = CustomUser.objects.create_user(username="other", email="other@example.com", password="pass")
+        self.friends = {}
+        for name, born in (("newyear", date(1990, 1, 2)), ("eve", date(1985, 12, 30)),
+                           ("later", date(1992, 1, 20)), ("leap", date(1996, 2, 29))):
+            friend = CustomUser.objects.create_user(username=name, email=f"{name}@example.com", password="pass",
+                                                    date_of_birth=born)
+            wishlist = Wishlist.objects.create(name=f"{name}'s list", user=friend)
+            WishlistShare.objects.create(wishlist=wishlist, shared_with=self.me)
+            self.friends[name] = friend
+        WishlistShare.objects.create(wishlist=Wishlist.objects.get(user=self.friends["eve"]), shared_with=self.other)
+
+    def names(self, reminders):
+        return [(friend.username, days) for friend, _, days in reminders]
+
+    def test_window_wraps_around_new_year(self):
+        reminders = birthdays.upcoming_birthdays(self.me, days=7, today=date(2026, 12, 28))
+        self.assertEqual(self.names(reminders), [("eve", 2), ("newyear", 5)])
+
+    def test_leap_day_birthdays_fall_on_february_28(self):
+        reminders = birthdays.upcoming_birthdays(self.me, days=3, today=date(2027, 2, 25))
+        self.assertEqual(self.names(reminders), [("leap", 3)])
+
+    # SQLite binds the EXTRACT unit as a parameter, so it never matches the expression index.
+    @skipUnless(connections['default'].vendor == 'postgresql', "requires PostgreSQL")
+    def test_query_uses_birthday_index(self):
+        with connections['default'].cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        for today in (date(2026, 6, 1), date(2026, 12, 28)):
+            queryset = birthdays.with_upcoming_birthday(CustomUser.objects.all(), 7, today)
+            self.assertIn('user_birthday_idx', queryset.explain())
+
+    def test_digest_queues_one_email_per_recipient_in_batches(self):
+        out = StringIO()
+        with CaptureQueriesContext(connections['default']) as queries:
+            call_command('send_birthday_digests', '--date', '2026-12-28', '--batch-size', '1', stdout=out)
+        self.assertIn("Queued 2 birthday digest(s).", out.getvalue())
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "accounts_outboxemail"')]
+        self.assertEqual(len(inserts), 2)
+
+        mine = OutboxEmail.objects.get(to="me@example.com")
+        self.assertLess(mine.body.index("eve"), mine.body.index("newyear"))
+        self.assertNotIn("later", mine.body)
+        self.assertIn("eve", OutboxEmail.objects.get(to="other@example.com").body)
+
+    def test_dashboard_widget(self):
+        self.client.force_login(self.me)
+        self.friends["later"].date_of_birth = timezone.localdate().replace(year=1992)
+        self.friends["later"].save()
+        response = self.client.get(reverse('wishlist:wishlist_list'))
+        self.assertContains(response, "Upcoming birthdays")
+        self.assertContains(response, "(today)")
+
+
+class GiftSuggestionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.owner = CustomUser.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.friend = CustomUser.objects.create_user(username="friend", email="friend@example.com", password="pass")
+        profile = UserProfile.objects.create(user=self.owner)
+        profile.likes.set([Interest.objects.create(name="🎁 Books"), Interest.objects.create(name="🎁 Board games")])
+        profile.dislikes.set([Interest.objects.create(name="🚫 Horror", type='dislike')])
+        self.wishlist = Wishlist.objects.create(name="Birthday", user=self.owner)
+        self.book = Item.objects.create(wishlist=self.wishlist, title="Fantasy book box set")
+        self.board_game = Item.objects.create(wishlist=self.wishlist, title="Cooperative board game")
+        Item.objects.create(wishlist=self.wishlist, title="Horror book")
+        Item.objects.create(wishlist=self.wishlist, title="Kettle")
+        elsewhere = Wishlist.objects.create(name="Ideas", user=self.friend)
+        for title in ("Poetry book", "Poetry book", "Chess board"):
+            Item.objects.create(wishlist=elsewhere, title=title)
+        Item.objects.create(wishlist=Wishlist.objects.create(name="More", user=self.friend), title="Poetry book")
+
+    def test_index_follows_title_changes(self):
+        self.assertEqual(set(self.book.tokens.values_list('token', flat=True)), {"fantasy", "book", "box", "set"})
+        self.book.title = "Comic books"
+        self.book.save()
+        self.assertEqual(set(self.book.tokens.values_list('token', flat=True)), {"comic", "book"})
+
+    def test_suggestions_rank_liked_and_skip_disliked(self):
+        ideas = suggestions.suggest_gifts(self.owner)
+        self.assertEqual(ideas['own'], [self.board_game, self.book])
+        self.assertEqual([(idea['item'].title, idea['count']) for idea in ideas['popular']],
+                         [("Poetry book", 2), ("Chess board", 1)])
+
+        self.board_game.reserve(self.friend)
+        self.assertEqual(suggestions.suggest_gifts(self.owner)['own'], [self.book])
+
+    def test_profile_changes_apply_immediately(self):
+        self.owner.userprofile.dislikes.add(Interest.objects.create(name="🚫 Poetry", type='dislike'))
+        ideas = suggestions.suggest_gifts(self.owner)
+        self.assertEqual([idea['item'].title for idea in ideas['popular']], ["Chess board"])
+
+    def test_rebuild_and_public_view(self):
+        ItemToken.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_suggestion_index', stdout=out)
+        self.assertIn("Indexed 8 item(s).", out.getvalue())
+
+        self.client.force_login(self.friend)
+        response = self.client.get(self.wishlist.get_absolute_url())
+        self.assertContains(response, "Gift ideas for owner")
+        self.assertContains(response, "on 2 wishlists")
+        self.assertEqual(response.context['gift_ideas']['own'], [self.board_game, self.book])
+
+    def test_public_view_caches_suggestions(self):
+        self.client.force_login(self.friend)
+        self.client.get(self.wishlist.get_absolute_url())
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.client.get(self.wishlist.get_absolute_url())
+        self.assertFalse([q for q in queries.captured_queries if 'wishlist_itemtoken' in q['sql']])
+
+        self.owner.userprofile.dislikes.add(Interest.objects.create(name="🚫 Poetry", type='dislike'))
+        response = self.client.get(self.wishlist.get_absolute_url())
+        self.assertEqual([idea['item'].title for idea in response.context['gift_ideas']['popular']], ["Chess board"])
+
+    def test_cached_suggestions_drop_reserved_and_deleted_items(self):
+        self.client.force_login(self.friend)
+        self.client.get(self.wishlist.get_absolute_url())
+        self.board_game.reserve(self.friend)
+        Item.objects.filter(title="Chess board").delete()
+        response = self.client.get(self.wishlist.get_absolute_url())
+        self.assertEqual(response.context['gift_ideas']['own'], [self.book])
+        self.assertEqual([idea['item'].title for idea in response.context['gift_ideas']['popular']], ["Poetry book"])
+
+
+class CanonicalUrlTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.wishlist = Wishlist.objects.create(name="Books", user=self.user)
+        self.client.force_login(self.user)
+
+    def create(self, url, **extra):
+        return self.client.post(reverse("wishlist:item_create", args=[self.wishlist.pk]),
+                                {'title': 'Placeholder', 'url': url, **extra})
+
+    def test_tracking_parameters_and_fragments_are_ignored(self):
+        canonical = "https://shop.example.com/p/1?color=red&size=m"
+        for url in (
+            "https://shop.example.com/p/1?size=m&color=red",
+            "http://www.Shop.Example.com:80/p/1/?color=red&utm_source=x&size=m&fbclid=abc#reviews",
+            "https://shop.example.com/p/1?gclid=1&color=red&size=m&utm_campaign=sale",
+        ):
+            self.assertEqual(canonicalize_url(url), canonical)
+        self.assertNotEqual(canonicalize_url("https://shop.example.com/p/1?color=blue"), canonical)
+        item = Item.objects.create(wishlist=self.wishlist, title="Mug", url="https://shop.example.com/p/1?ref=home")
+        self.assertEqual(item.url_hash, url_hash("https://shop.example.com/p/1"))
+
+    def test_invalid_port_kept_as_entered(self):
+        self.assertEqual(canonicalize_url("http://www.Shop.com:99999/x/"), "https://shop.com:99999/x")
+        response = self.create("https://shop.com:99999/x")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Item.objects.get().url_hash, url_hash("https://shop.com:99999/x"))
+
+    def test_duplicate_in_wishlist_needs_confirmation(self):
+        original = Item.objects.create(wishlist=self.wishlist, title="Mug", url="http://127.0.0.1:9/p/1")
+        response = self.create("http://127.0.0.1:9/p/1?utm_medium=email")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['duplicate'], original)
+        self.assertEqual(Item.objects.count(), 1)
+
+        response = self.create("http://127.0.0.1:9/p/1?utm_medium=email", confirm_duplicate='1')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Item.objects.count(), 2)
+
+    def test_known_product_is_not_fetched_again(self):
+        other = Wishlist.objects.create(name="Gifts", user=self.user)
+        with FakeShopServer() as shop:
+            self.create(shop.product_url(7))
+            self.assertEqual(shop.requests_served, 1)
+            self.client.post(reverse("wishlist:item_create", args=[other.pk]),
+                             {'title': 'Placeholder', 'url': shop.product_url(7) + '?utm_source=newsletter'})
+            self.assertEqual(shop.requests_served, 1)
+        first, second = Item.objects.order_by('pk')
+        self.assertEqual(second.wishlist, other)
+        self.assertEqual((second.title, second.price, second.image_url), (first.title, first.price, first.image_url))
+
+    def test_private_description_not_copied(self):
+        stranger = CustomUser.objects.create_user(username="stranger", email="stranger@example.com", password="pass")
+        Item.objects.create(
+            wishlist=Wishlist.objects.create(name="Private", user=stranger), title="Mug",
+            url="https://shop.example.com/p/1", price=5, description="For my sister, size M",
+        )
+        data = reusable_product_data("https://shop.example.com/p/1")
+        self.assertEqual((data['title'], data['price']), ("Mug", 5))
+        self.assertNotIn('description', data)
+
+    def test_backfill_command(self):
+        item = Item.objects.create(wishlist=self.wishlist, title="Mug", url="https://shop.example.com/p/1")
+        Item.objects.filter(pk=item.pk).update(url_hash='')
+        out = StringIO()
+        call_command('backfill_url_hashes', stdout=out)
+        self.assertIn("Updated 1 item(s).", out.getvalue())
+        item.refresh_from_db()
+        self.assertEqual(item.url_hash, url_hash(item.url))
+
+
+@override_settings(SCRAPE_HOST_BURST=100)
+class PriceTrackingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shop = self.enterContext(FakeShopServer())
+        self.owner = CustomUser.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.friend = CustomUser.objects.create_user(username="friend", email="friend@example.com", password="pass")
+        self.wishlist = Wishlist.objects.create(name="Birthday", user=self.owner)
+        FriendFeedEntry.objects.create(wishlist=self.wishlist, user=self.friend)
+        self.items = [
+            Item.objects.create(wishlist=self.wishlist, title=f"Item {n}", url=self.shop.product_url(n), price=101)
+            for n in range(3)
+        ]
+        self.items[0].reserve(self.friend)
+        Item.objects.update(next_price_check_at=timezone.now())
+
+    def test_new_items_are_scheduled(self):
+        item = Item.objects.create(wishlist=self.wishlist, title="Lamp", url="https://shop.example.com/lamp")
+        self.assertGreater(item.next_price_check_at, timezone.now())
+        self.assertIsNone(Item.objects.create(wishlist=self.wishlist, title="Idea").next_price_check_at)
+
+    def test_priority_queue_prefers_unreserved_items_on_active_wishlists(self):
+        claimed = prices.claim_due_items(2)
+        self.assertEqual([item.pk for item in claimed], [self.items[1].pk, self.items[2].pk])
+        self.assertEqual(prices.claim_due_items(10), [self.items[0]])
+        self.assertEqual(prices.claim_due_items(10), [])
+
+    def test_price_changes_are_recorded_and_unchanged_pages_are_not_refetched(self):
+        self.shop.prices['1'] = 80
+        out = StringIO()
+        call_command('track_prices', stdout=out)
+        self.assertIn("changed: 1", out.getvalue())
+        self.assertEqual(self.shop.requests_served, 3)
+        changed = Item.objects.get(pk=self.items[1].pk)
+        self.assertEqual(changed.price, 80)
+        change = changed.price_changes.get()
+        self.assertEqual((change.old_price, change.new_price, change.is_drop), (101, 80, True))
+        self.assertTrue(changed.etag)
+        self.assertEqual(PriceChange.objects.count(), 1)
+
+        self.client.force_login(self.friend)
+        self.assertContains(self.client.get(reverse('wishlist:public_item_detail', args=[changed.pk])),
+                            "Price dropped from 101.00 UAH")
+
+        Item.objects.update(next_price_check_at=timezone.now())
+        call_command('track_prices', stdout=StringIO())
+        self.assertEqual(self.shop.not_modified_served, 3)
+        self.assertEqual(PriceChange.objects.count(), 1)
+
+    def test_url_edited_during_check_is_left_alone(self):
+        self.shop.prices['1'] = 80
+        claimed = next(item for item in prices.claim_due_items(10) if item.pk == self.items[1].pk)
+        edited = Item.objects.get(pk=claimed.pk)
+        edited.url = self.shop.product_url(9)
+        edited.save()
+
+        self.assertEqual(prices.check_price(claimed), 'stale')
+        edited.refresh_from_db()
+        self.assertEqual((edited.price, edited.etag), (101, ''))
+        self.assertFalse(PriceChange.objects.exists())
+
+    def test_throttled_hosts_are_retried_later(self):
+        with override_settings(SCRAPE_HOST_BURST=1, SCRAPE_HOST_RATE=0.001):
+            counts = prices.check_due_prices()
+        self.assertEqual((counts.get('ok'), counts.get('throttled')), (1, 2))
+        retry_at = timezone.now() + timedelta(seconds=settings.PRICE_CHECK_RETRY)
+        throttled = Item.objects.filter(etag='')
+        self.assertEqual(throttled.count(), 2)
+        for item in throttled:
+            self.assertAlmostEqual(item.next_price_check_at, retry_at, delta=timedelta(minutes=1))
+
+
+class ScrapeThrottlingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass"
+        )
+        self.wishlist = Wishlist.objects.create(name="Books", user=self.user)
+        self.shop = self.enterContext(FakeShopServer())
+
+    @override_settings(SCRAPE_BREAKER_FAILURES=2)
+    def test_breaker_opens_after_failures(self):
+        self.shop.status = 503
+        for n in range(2):
+            self.assertEqual(scrape_product_data(self.shop.product_url(n)), {})
+        self.assertEqual(self.shop.requests_served, 2)
+
+        self.shop.status = 200
+        self.assertEqual(scrape_product_data(self.shop.product_url(3)), {})
+        self.assertEqual(self.shop.requests_served, 2)
+
+    @override_settings(SCRAPE_BREAKER_FAILURES=1)
+    def test_item_saved_with_user_data_while_breaker_open(self):
+        self.shop.status = 503
+        scrape_product_data(self.shop.product_url(1))
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("wishlist:item_create", args=[self.wishlist.pk]),
+            {'title': 'Kettle', 'url': self.shop.product_url(2)},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Item.objects.get(wishlist=self.wishlist).title, "Kettle")
+        self.assertEqual(self.shop.requests_served, 1)
+
+    @override_settings(SCRAPE_BREAKER_FAILURES=1, SCRAPE_BREAKER_OPEN_SECONDS=0)
+    def test_half_open_probe_closes_breaker(self):
+        guard = HostGuard('shop.example.com')
+        guard.record_failure()
+        self.assertFalse(guard.is_open())  # this caller is the probe
+        self.assertTrue(guard.is_open())
+        guard.record_success()
+        self.assertFalse(guard.is_open())
+
+    @override_settings(SCRAPE_BREAKER_FAILURES=1, SCRAPE_BREAKER_OPEN_SECONDS=0, SCRAPE_HOST_BURST=1,
+                       SCRAPE_HOST_RATE=0.001)
+    def test_unused_probe_released(self):
+        HostGuard('shop.example.com').record_failure()
+        self.assertTrue(HostGuard('shop.example.com').take_token())
+        self.assertFalse(HostGuard('shop.example.com').acquire())  # probe taken, then rate limited
+        guard = HostGuard('shop.example.com')
+        self.assertFalse(guard.is_open())  # the next caller can probe
+        self.assertTrue(guard.is_open())
+
+    @override_settings(SCRAPE_HOST_CONCURRENCY=2)
+    def test_concurrency_cap(self):
+        guard = HostGuard('shop.example.com')
+        self.assertTrue(guard.acquire())
+        self.assertTrue(guard.acquire())
+        self.assertFalse(guard.acquire())
+        guard.release(True)
+        self.assertTrue(guard.acquire())
+
+    @override_settings(SCRAPE_HOST_BURST=3, SCRAPE_HOST_RATE=0.001)
+    def test_rate_limit(self):
+        guard = HostGuard('shop.example.com')
+        self.assertEqual([guard.take_token() for _ in range(4)], [True, True, True, False])
+        self.assertTrue(HostGuard('other.example.com').take_token())
+
+
+class PerformanceMetricsTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass"
+        )
+        for histogram in HISTOGRAMS:
+            histogram.reset()
+            self.addCleanup(histogram.reset)
+
+    def test_server_timing_header(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("wishlist:wishlist_list"))
+        timing = response['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertRegex(timing, r'db;desc="[1-9]\d* queries"')
+        self.assertIn('template;dur=', timing)
+
+    def test_metrics_endpoint_exposes_histograms(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse("wishlist:wishlist_list"))
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_count{view="wishlist:wishlist_list"} 1', body)
+        self.assertIn('# TYPE db_queries_per_request histogram', body)
+
+    def test_metrics_endpoint_is_restricted(self):
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_not_timed(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("wishlist:wishlist_list"))
+        self.assertNotIn('Server-Timing', response)
+
+
+
+class BenchmarkHarnessTests(TransactionTestCase):
+    def test_seed_dataset_and_bench_views(self):
+        call_command('seed_dataset', '--users', '6', '--wishlists', '2', '--items', '3',
+                     '--shares', '2', stdout=StringIO())
+        self.assertEqual(CustomUser.objects.count(), 6)
+        self.assertEqual(UserProfile.objects.count(), 6)
+        self.assertEqual(Wishlist.objects.count(), 12)
+        self.assertEqual(Item.objects.count(), 36)
+        self.assertEqual(WishlistShare.objects.count(), 12)
+
+        out = StringIO()
+        call_command('bench_views', '--requests', '4', '--concurrency', '1', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report['views']), {
+            'public_wishlist', 'friends_wishlists', 'wishlist_list', 'reserve_item', 'edit_profile',
+        })
+        for result in report['views'].values():
+            self.assertEqual(result['requests'], 4)
+            self.assertEqual(result['errors'], 0)
+            self.assertGreater(result['queries_per_request'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+
+
+@override_settings(SCRAPE_HOST_BURST=100)
+class ScraperCorpusTests(TestCase):
+    """
+    Parser regression suite over the offline corpus in scraper_corpus/.
+    Fields listed in a page's known_failures must still be wrong; when a
+    parser change fixes one, remove it from manifest.json.
+    """
+    def setUp(self):
+        cache.clear()
+
+    def test_corpus_pages(self):
+        with CorpusServer() as server:
+            for entry in load_corpus():
+                data = scrape_product_data(server.page_url(entry['file']))
+                for field in CORPUS_FIELDS:
+                    with self.subTest(page=entry['file'], field=field):
+                        matches = field_matches(field, data.get(field), entry['expected'][field])
+                        if field in entry['known_failures']:
+                            self.assertFalse(matches, "Fixed a known failure? Update manifest.json.")
+                        else:
+                            self.assertTrue(matches, f"{field} regressed: got {data.get(field)!r}")
+
+    def test_bench_parsers_reports_accuracy(self):
+        out = StringIO()
+        call_command('bench_parsers', '--repeat', '1', '--strategies', 'html.parser', stdout=out)
+        result = json.loads(out.getvalue())['strategies']['html.parser']
+        self.assertGreater(result['pages_per_second'], 0)
+        self.assertGreater(result['peak_memory_kb'], 0)
+        self.assertEqual(set(result['accuracy']), set(CORPUS_FIELDS))
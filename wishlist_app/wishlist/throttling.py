@@ -0,0 +1,160 @@
+import logging
+import time
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class HostGuard:
+    """
+    Protects a remote host (and our workers) during outbound scraping.
+
+    Combines three per-host limits, all stored in the Django cache so they are
+    shared by every worker process:
+
+    * a circuit breaker that opens after SCRAPE_BREAKER_FAILURES failures
+      within SCRAPE_BREAKER_WINDOW seconds and skips the host for
+      SCRAPE_BREAKER_OPEN_SECONDS, then lets a single probe request through;
+    * a cap of SCRAPE_HOST_CONCURRENCY requests in flight;
+    * a token bucket refilled at SCRAPE_HOST_RATE requests per second
+      with a burst of SCRAPE_HOST_BURST.
+
+    Usage:
+        guard = HostGuard.for_url(url)
+        if guard.acquire():
+            try:
+                ...
+            finally:
+                guard.release(success)
+    """
+    def __init__(self, host):
+        self.host = host or ''
+        self._probing = False
+
+    @classmethod
+    def for_url(cls, url):
+        return cls(urlsplit(url).hostname)
+
+    def _key(self, name):
+        return f"scrape:{name}:{self.host}"
+
+    # ===== Circuit breaker =====
+
+    def is_open(self):
+        """Return True while requests to this host should be skipped."""
+        open_until = cache.get(self._key('open_until'))
+        if open_until is None:
+            return False
+        if time.time() < open_until:
+            return True
+        # Half-open: the first caller gets to probe the host, the rest wait.
+        self._probing = cache.add(self._key('probe'), 1, timeout=settings.SCRAPE_SLOT_TTL)
+        return not self._probing
+
+    def release_probe(self):
+        """Give up the half-open probe taken by is_open() without using it."""
+        if self._probing:
+            cache.delete(self._key('probe'))
+            self._probing = False
+
+    def record_success(self):
+        cache.delete_many([self._key('failures'), self._key('open_until'), self._key('probe')])
+
+    def record_failure(self):
+        failures_key = self._key('failures')
+        cache.add(failures_key, 0, timeout=settings.SCRAPE_BREAKER_WINDOW)
+        try:
+            failures = cache.incr(failures_key)
+        except ValueError:
+            failures = 1
+        if failures >= settings.SCRAPE_BREAKER_FAILURES or cache.get(self._key('probe')):
+            open_seconds = settings.SCRAPE_BREAKER_OPEN_SECONDS
+            cache.set(self._key('open_until'), time.time() + open_seconds,
+                      timeout=open_seconds + settings.SCRAPE_SLOT_TTL)
+            cache.delete_many([failures_key, self._key('probe')])
+            logger.warning("Circuit opened for %s for %ss", self.host, open_seconds)
+
+    # ===== Concurrency cap =====
+
+    def acquire_slot(self):
+        key = self._key('inflight')
+        cache.add(key, 0, timeout=settings.SCRAPE_SLOT_TTL)
+        try:
+            in_flight = cache.incr(key)
+        except ValueError:
+            return True
+        if in_flight > settings.SCRAPE_HOST_CONCURRENCY:
+            self.release_slot()
+            return False
+        return True
+
+    def release_slot(self):
+        try:
+            cache.decr(self._key('inflight'))
+        except ValueError:
+            pass
+
+    # ===== Token bucket =====
+
+    def take_token(self):
+        """
+        Take one token from the host's bucket. The read-modify-write is not
+        atomic across processes, so the limit is approximate under contention.
+        """
+        key = self._key('bucket')
+        now = time.time()
+        burst = settings.SCRAPE_HOST_BURST
+        tokens, updated = cache.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * settings.SCRAPE_HOST_RATE)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        cache.set(key, (tokens, now), timeout=60)
+        return allowed
+
+    # ===== Combined =====
+
+    def acquire(self):
+        """
+        Check breaker, rate limit and concurrency cap.
+        Returns:
+            bool: True if the request may go ahead; release() must follow.
+        """
+        if not self.host:
+            return True
+        if self.is_open():
+            logger.info("Skipping %s: circuit open", self.host)
+            return False
+        if not self.take_token():
+            logger.info("Skipping %s: rate limited", self.host)
+            self.release_probe()
+            return False
+        if not self.acquire_slot():
+            logger.info("Skipping %s: too many requests in flight", self.host)
+            self.release_probe()
+            return False
+        return True
+
+    def release(self, success):
+        """
+        Free the concurrency slot and report the outcome to the breaker.
+        Args:
+            success (bool): False for timeouts, connection errors and 5xx responses.
+        """
+        if not self.host:
+            return
+        self.release_slot()
+        if success:
+            self.record_success()
+        else:
+            self.record_failure()
+
+    async def aacquire(self):
+        return await sync_to_async(self.acquire, thread_sensitive=False)()
+
+    async def arelease(self, success):
+        await sync_to_async(self.release, thread_sensitive=False)(success)
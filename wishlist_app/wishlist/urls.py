@@ -7,16 +7,21 @@ urlpatterns = [
     path('w/<str:code>/<slug:name>/', views.public_wishlist, name='public_view'),
     path('all/', views.wishlist_list, name='wishlist_list'),
     path('<int:pk>/', views.wishlist_detail, name='wishlist_detail'),
+    path('<int:pk>/events/', views.wishlist_events, name='wishlist_events'),
     path('create/', views.wishlist_create, name='wishlist_create'),
     path('wishlist/<int:pk>/delete/', views.wishlist_delete, name='wishlist_delete'),
+    path('<int:pk>/items/bulk/', views.wishlist_items_bulk, name='wishlist_items_bulk'),
     path('<int:pk>/edit_name/', views.wishlist_edit_name, name='wishlist_edit_name'),
     path('<int:wishlist_pk>/item/create/', views.item_create, name='item_create'),
     path('item/<int:pk>/', views.item_detail, name='item_detail'),
     path('item/<int:pk>/edit/', views.item_edit, name='item_edit'),
     path('item/<int:pk>/public/', views.public_item_detail, name='public_item_detail'),
+    path('item/<int:pk>/image/', views.item_image, name='item_image'),
     path('item/<int:pk>/reserve/', views.reserve_item, name='reserve_item'),
     path('item/<int:pk>/cancel/', views.cancel_reservation, name='cancel_reservation'),
     path('item/<int:pk>/delete/', views.item_delete, name='item_delete'),
+    path('item/<int:pk>/move/', views.item_move, name='item_move'),
+    path('reserved/', views.reserved_gifts, name='reserved_gifts'),
     path('wishlists/friends/', views.friends_wishlists, name='friends_wishlists'),
     path('wishlist/<int:pk>/edit-image/', views.wishlist_edit_image, name='wishlist_edit_image'),
 ]
\ No newline at end of file
@@ -1,16 +1,26 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
 
-import re
+import json
 import uuid
-import requests
-from bs4 import BeautifulSoup
-from django.core.files.base import ContentFile
-from django.http import HttpResponseForbidden
+from itertools import groupby
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import FileResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.templatetags.static import static
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_POST
 
-from .forms import WishlistForm, ItemForm, WishlistImageForm
-from .models import Item, Wishlist, WishlistShare
+from wishlist_app.images import normalize_image
+
+from .forms import BulkItemForm, WishlistForm, ItemForm, WishlistImageForm
+from . import birthdays, bulk, canonical, feed, image_proxy, live, suggestions
+from .models import FriendFeedEntry, Item, Wishlist
+from .scraping import ascrape_product_data
+from .shares import share_recorder
 
 
 # Create your views here.
@@ -18,24 +28,34 @@ from .models import Item, Wishlist, WishlistShare
 @login_required
 def home(request):
     """
-    Render the home page showing all wishlists of the logged-in user.
+    Render the home page showing all wishlists of the logged-in user
+    and friends' upcoming birthdays.
     """
     wishlists = Wishlist.objects.filter(user=request.user)
-    return render(request, 'wishlist/wishlist_list.html', {'wishlists': wishlists})
+    return render(request, 'wishlist/wishlist_list.html', {
+        'wishlists': wishlists,
+        'birthdays': birthdays.cached_upcoming_birthdays(request.user),
+    })
 
 @login_required
 def wishlist_list(request):
     """
-    Render a list of wishlists for the logged-in user, ordered by creation date.
+    Render a list of wishlists for the logged-in user, ordered by creation date,
+    and friends' upcoming birthdays.
     """
     wishlists = Wishlist.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'wishlist/wishlist_list.html', {'wishlists': wishlists})
+    return render(request, 'wishlist/wishlist_list.html', {
+        'wishlists': wishlists,
+        'birthdays': birthdays.cached_upcoming_birthdays(request.user),
+    })
 
 @login_required
 def public_wishlist(request, code, name):
     """
     Render a public view of a wishlist by its unique code.
-    If the user is logged in and not the owner, record a WishlistShare.
+    If the user is logged in and not the owner, record a WishlistShare
+    through the share_recorder, which only writes pairs it has not seen,
+    and suggest gifts matching the owner's interests.
     
     Args:
         code (str): Unique code identifying the wishlist.
@@ -45,21 +65,65 @@ def public_wishlist(request, code, name):
     
     is_owner = request.user.is_authenticated and request.user == wishlist.user
 
+    gift_ideas = None
     if request.user.is_authenticated and not is_owner:
-        WishlistShare.objects.get_or_create(
-            wishlist=wishlist,
-            shared_with=request.user
-        )
+        share_recorder.record(wishlist.pk, request.user.pk)
+        feed.mark_seen(request.user.pk, wishlist.pk)
+        gift_ideas = suggestions.cached_suggest_gifts(wishlist.user)
 
     return render(
         request,
         'wishlist/public_view.html',
         {
             'wishlist': wishlist,
-            'is_owner': is_owner
+            'is_owner': is_owner,
+            'gift_ideas': gift_ideas,
         }
     )
 
+@login_required
+async def wishlist_events(request, pk):
+    """
+    Server-Sent Events stream of item changes on a wishlist, used by
+    public_view.html to update in place. Events: item-added, item-removed,
+    reserved and cancelled. Reconnecting browsers resume from Last-Event-ID.
+    Added items arrive as cards rendered for a friend; the owner's stream
+    re-renders them with the delete control.
+    Meant to be served by an ASGI server; each open stream only holds a coroutine.
+    Args:
+        pk (int): Primary key of the wishlist.
+    """
+    # Soft-deleted wishlists are not streamed (a reconnect after deletion gets a 404).
+    wishlist = await aget_object_or_404(Wishlist.objects, pk=pk)
+    is_owner = wishlist.user_id == (await request.auser()).pk
+    try:
+        last_seq = int(request.headers['Last-Event-ID'])
+    except (KeyError, ValueError):
+        last_seq = None
+
+    async def owner_card(item_pk):
+        item = await Item.objects.filter(pk=item_pk).afirst()
+        if item is None:
+            return None
+        return await sync_to_async(render_to_string)(
+            'wishlist/_public_item.html', {'item': item, 'is_owner': True}, request=request,
+        )
+
+    async def stream():
+        yield f"retry: {settings.LIVE_RETRY_MS}\n\n"
+        async for seq, event, data in live.subscribe(wishlist.pk, last_seq):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            if is_owner and event == 'item-added':
+                data = {**data, 'html': await owner_card(data['item']) or data.get('html', '')}
+            yield f"id: {seq}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
 def wishlist_detail(request, pk):
     """
@@ -69,15 +133,47 @@ def wishlist_detail(request, pk):
     """
     wishlist = get_object_or_404(Wishlist, pk=pk)
     is_owner = wishlist.user == request.user
+    other_wishlists = Wishlist.objects.filter(user=request.user).exclude(pk=pk) if is_owner else []
     return render(
         request,
         'wishlist/wishlist_detail.html',
         {
             'wishlist': wishlist,
-            'is_owner': is_owner
+            'is_owner': is_owner,
+            'other_wishlists': other_wishlists,
         }
     )
 
+@login_required
+@require_POST
+def wishlist_items_bulk(request, pk):
+    """
+    Move, copy or delete the selected items of a wishlist in one request.
+    Moves are a single UPDATE, copies one bulk_create sharing the image
+    files, and deletes one batched DELETE with file cleanup after commit.
+    Args:
+        pk (int): Primary key of the wishlist the items are selected from.
+    """
+    wishlist = get_object_or_404(Wishlist, pk=pk, user=request.user)
+    form = BulkItemForm(wishlist, request.POST)
+    if not form.is_valid():
+        messages.error(request, "Select some items and a wishlist.")
+        return redirect('wishlist:wishlist_detail', pk=pk)
+
+    items = form.cleaned_data['items']
+    target = form.cleaned_data['target']
+    action = form.cleaned_data['action']
+    if action == 'move':
+        count = bulk.move_items(items, target)
+        messages.success(request, f"Moved {count} item(s) to '{target.name}'.")
+    elif action == 'copy':
+        count = len(bulk.copy_items(items, target))
+        messages.success(request, f"Copied {count} item(s) to '{target.name}'.")
+    else:
+        count = bulk.delete_items(items)
+        messages.success(request, f"Deleted {count} item(s).")
+    return redirect('wishlist:wishlist_detail', pk=pk)
+
 @login_required
 def wishlist_create(request):
     """
@@ -100,116 +196,99 @@ def wishlist_create(request):
 def wishlist_delete(request, pk):
     """
     Handle deletion of a wishlist by its owner.
+    The wishlist is soft-deleted and hidden at once; its items and files are
+    removed in the background by purge_deleted_wishlists.
     Args:
         pk (int): Primary key of the wishlist to delete.
     """
     wishlist = get_object_or_404(Wishlist, pk=pk, user=request.user)
 
     if request.method == "POST":
-        wishlist.delete()
+        wishlist.soft_delete()
         messages.success(request, f"Wishlist '{wishlist.name}' was deleted.")
         return redirect('wishlist:wishlist_list') 
     return render(request, 'wishlist/wishlist_confirm_delete.html', {'wishlist': wishlist})
 
-def scrape_product_data(url):
+def save_item_with_scraped_data(item, data):
     """
-    Scrape product data from a given URL.
+    Copy scraped product data onto an item and save it.
+    The downloaded image is normalized like user uploads. In lazy image mode
+    nothing is downloaded: the remote image_url replaces the image and is
+    fetched by item_image on first view.
     Args:
-        url (str): URL of the product page.
-    Returns:
-        dict: Dictionary containing 'title', 'price', and 'image_url'.
+        item (Item): Unsaved or existing item.
+        data (dict): Result of product_data (may be empty); ``image_name``
+            points the item at an existing image file.
+    """
+    if data.get('title'):
+        item.title = data['title']
+    if data.get('price') is not None:
+        item.price = data['price']
+    if data.get('description'):
+        item.description = data['description']
+    if data.get('image_url'):
+        item.image_url = data['image_url']
+        if settings.SCRAPE_IMAGE_MODE == 'lazy':
+            item.image = None
+    if data.get('image_name'):
+        item.image = data['image_name']
+    if data.get('image_content'):
+        try:
+            image = normalize_image(data['image_content'], uuid.uuid4().hex)
+            item.image.save(image.name, image, save=False)
+        except ValidationError:
+            pass  # not an image; keep the item without one
+    item.save()
+
+
+async def product_data(url, exclude_pk=None):
     """
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        resp = requests.get(url, headers=headers, timeout=10)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, 'html.parser')
-
-        # ===== Title =====
-        title_tag = soup.find('h1') 
-        if not title_tag: 
-            title_tag = soup.find('h1', class_='product-title')
-        title = title_tag.get_text(strip=True) if title_tag else ''
-
-        # ===== Price =====
-        prices = []
-        for tag in soup.find_all(class_=re.compile(r'price', re.I)):
-            text = tag.get_text(strip=True)
-            match = re.search(r'([\d\s,.]+)\s*(UAH|USD|грн|₴|$)', text, re.IGNORECASE)
-            if match:
-                price_str = match.group(1).replace(' ', '').replace(',', '.')
-                try:
-                    val = float(price_str)
-                    if val > 0:
-                        prices.append(val)
-                except ValueError:
-                    continue
-
-        if prices:
-            price = max(prices)
-        else:
-            price = None
-
-        # ===== Image =====
-        img_tag = soup.find('meta', property='og:image')
-        image_url = img_tag['content'] if img_tag else ''
-        print("DEBUG image_url:", image_url)
-
-        return {
-            'title': title,
-            'price': price,
-            'image_url': image_url,
-        }
-    except Exception as e:
-        print('Scrape error:', e)
-        return {}
+    Product data for a URL: copied from another item with the same canonical
+    URL when there is one, otherwise scraped from the shop.
+    """
+    data = await sync_to_async(canonical.reusable_product_data)(url, exclude_pk)
+    if data:
+        return data
+    return await ascrape_product_data(url, fetch_image=settings.SCRAPE_IMAGE_MODE == 'eager')
 
 @login_required
-def item_create(request, wishlist_pk):
+async def item_create(request, wishlist_pk):
     """
     Create a new item for a wishlist.
-    If a URL is provided, attempt to scrape product data and image.
+    If a URL is provided, warn when the wishlist already has the same product
+    (until confirmed), then fill in product data and image from an item with
+    the same canonical URL or by scraping.
+    Runs as an async view so that waiting on the shop does not block a worker
+    thread; ORM work and rendering go through sync_to_async.
     Args:
         wishlist_pk (int): Primary key of the wishlist to add the item to.
     """
-    wishlist = get_object_or_404(Wishlist, pk=wishlist_pk, user=request.user)
+    user = await request.auser()
+    wishlist = await aget_object_or_404(Wishlist, pk=wishlist_pk, user=user)
 
     if request.method == 'POST':
         form = ItemForm(request.POST, request.FILES)
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             item = form.save(commit=False)
             item.wishlist = wishlist
 
+            if item.url and not request.POST.get('confirm_duplicate'):
+                duplicate = await sync_to_async(canonical.find_duplicate)(wishlist, item.url)
+                if duplicate:
+                    return await sync_to_async(render)(request, 'wishlist/item_form.html', {
+                        'form': form, 'wishlist': wishlist, 'duplicate': duplicate,
+                    })
+
+            data = {}
             if item.url:
-                
-                data = scrape_product_data(item.url)
-
-                if data.get('title'):
-                    item.title = data['title']
-                if data.get('price') is not None:
-                    item.price = data['price']
-                if data.get('description'):
-                    item.description = data['description']
-
-                if data.get('image_url'):
-                    try:
-                        headers = {
-                            "User-Agent": "Mozilla/5.0",
-                            "Referer": item.url
-                        }
-                        img_resp = requests.get(data['image_url'], headers=headers, stream=True, timeout=10)
-                        img_resp.raise_for_status()
-                        file_name = f"{uuid.uuid4().hex}.jpg"
-                        item.image.save(file_name, ContentFile(img_resp.content), save=False)
-                    except Exception as e:
-                        print(f"Image download error: {e}")
-
-            item.save()
+                data = await product_data(item.url)
+
+            await sync_to_async(save_item_with_scraped_data)(item, data)
             return redirect('wishlist:wishlist_detail', pk=wishlist.pk)
     else:
         form = ItemForm()
 
-    return render(request, 'wishlist/item_form.html', {'form': form, 'wishlist': wishlist})
+    return await sync_to_async(render)(request, 'wishlist/item_form.html', {'form': form, 'wishlist': wishlist})
 
 
 def public_item_detail(request, pk):
@@ -220,7 +299,7 @@ def public_item_detail(request, pk):
     Returns:
         HttpResponse: Rendered template with item details.
     """
-    item = get_object_or_404(Item, pk=pk)
+    item = get_object_or_404(Item, pk=pk, wishlist__deleted_at__isnull=True)
     wishlist = item.wishlist  
 
     return render(request, 'wishlist/public_item_detail.html', {
@@ -230,7 +309,7 @@ def public_item_detail(request, pk):
     })
     
 
-def item_edit(request, pk):
+async def item_edit(request, pk):
     """
     Edit an existing item. If the URL has changed, scrape product data and update image.
     Args:
@@ -238,43 +317,48 @@ def item_edit(request, pk):
     Returns:
         HttpResponse: Rendered template with edit form or redirects to item detail on success.
     """
-    item = get_object_or_404(Item, pk=pk)
+    item = await aget_object_or_404(Item, pk=pk, wishlist__deleted_at__isnull=True)
 
     if request.method == "POST":
         old_url = item.url 
         form = ItemForm(request.POST, request.FILES, instance=item)
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             item = form.save(commit=False)
 
+            data = {}
             if item.url and item.url != old_url:
-                data = scrape_product_data(item.url)
-
-                if data.get('title'):
-                    item.title = data['title']
-                if data.get('price') is not None:
-                    item.price = data['price']
-                if data.get('description'):
-                    item.description = data['description']
-
-                if data.get('image_url'):
-                    try:
-                        headers = {
-                            "User-Agent": "Mozilla/5.0",
-                            "Referer": item.url
-                        }
-                        img_resp = requests.get(data['image_url'], headers=headers, stream=True, timeout=10)
-                        img_resp.raise_for_status()
-                        file_name = f"{uuid.uuid4().hex}.jpg"
-                        item.image.save(file_name, ContentFile(img_resp.content), save=False)
-                    except Exception as e:
-                        print(f"Image download error: {e}")
-
-            item.save()
+                data = await product_data(item.url, exclude_pk=item.pk)
+
+            await sync_to_async(save_item_with_scraped_data)(item, data)
             return redirect('wishlist:item_detail', pk=item.pk)
     else:
         form = ItemForm(instance=item)
 
-    return render(request, 'wishlist/item_edit.html', {'form': form, 'item': item})
+    return await sync_to_async(render)(request, 'wishlist/item_edit.html', {'form': form, 'item': item})
+
+def item_image(request, pk):
+    """
+    Serve the remote image of an item through the local disk cache.
+    The image is fetched and normalized on the first request; the URL carries
+    a version of image_url, so responses can be cached for a year.
+    Args:
+        pk (int): Primary key of the item.
+    Returns:
+        FileResponse: Cached image, or a redirect to the default gift image.
+    """
+    item = get_object_or_404(Item, pk=pk, wishlist__deleted_at__isnull=True)
+    path = image_proxy.get_cached_image(item.image_url) if item.image_url else None
+    if path is None:
+        response = redirect(static('images/default-gift.png'))
+        patch_cache_control(response, public=True, max_age=300)
+        return response
+
+    response = FileResponse(open(path, 'rb'), content_type=image_proxy.content_type(path))
+    if request.GET.get('v') == image_proxy.url_key(item.image_url)[:16]:
+        patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=300)
+    return response
 
 @login_required
 def item_detail(request, pk):
@@ -286,7 +370,7 @@ def item_detail(request, pk):
     Returns:
         HttpResponse: Rendered template with item details or redirect to public item view.
     """
-    item = get_object_or_404(Item, pk=pk)
+    item = get_object_or_404(Item, pk=pk, wishlist__deleted_at__isnull=True)
     if item.wishlist.user != request.user:
         return redirect('wishlist:public_item_detail', pk=item.pk)
     return render(request, 'wishlist/item_detail.html', {'item': item})
@@ -300,7 +384,7 @@ def item_delete(request, pk):
     Returns:
         HttpResponse: Redirect to wishlist detail on deletion or render confirmation template.
     """
-    item = get_object_or_404(Item, pk=pk)
+    item = get_object_or_404(Item, pk=pk, wishlist__deleted_at__isnull=True)
     if item.wishlist.user != request.user:
         return HttpResponseForbidden("You can't delete this item.")
     if request.method == 'POST':
@@ -309,6 +393,46 @@ def item_delete(request, pk):
         return redirect('wishlist:wishlist_detail', pk=wishlist_pk)
     return render(request, 'wishlist/item_confirm_delete.html', {'item': item})
 
+@login_required
+@require_POST
+def item_move(request, pk):
+    """
+    Move an item between two neighbours of the same wishlist (drag and drop).
+    Only the moved item's rank is written; if the neighbours leave no room
+    (e.g. items without a rank yet) the wishlist is rebalanced first.
+    Args:
+        pk (int): Primary key of the item.
+    POST:
+        before (int, optional): Item that should now precede it.
+        after (int, optional): Item that should now follow it.
+    Returns:
+        JsonResponse: The item's new rank.
+    """
+    item = get_object_or_404(Item, pk=pk, wishlist__deleted_at__isnull=True)
+    if item.wishlist.user != request.user:
+        return HttpResponseForbidden("You can't move this item.")
+
+    neighbours = {}
+    for position in ('before', 'after'):
+        neighbour_pk = request.POST.get(position)
+        if neighbour_pk:
+            try:
+                neighbours[position] = Item.objects.get(pk=neighbour_pk, wishlist_id=item.wishlist_id)
+            except (Item.DoesNotExist, ValueError):
+                return HttpResponseBadRequest(f"Unknown {position} item.")
+
+    try:
+        item.move_between(neighbours.get('before'), neighbours.get('after'))
+    except ValueError:
+        item.wishlist.rebalance_item_ranks()
+        for neighbour in neighbours.values():
+            neighbour.refresh_from_db(fields=['rank'])
+        try:
+            item.move_between(neighbours.get('before'), neighbours.get('after'))
+        except ValueError:
+            return HttpResponseBadRequest("Invalid position.")
+    return JsonResponse({'id': item.pk, 'rank': item.rank})
+
 
 @login_required
 def reserve_item(request, pk):
@@ -319,7 +443,7 @@ def reserve_item(request, pk):
     Returns:
         HttpResponse: Redirect to public item detail with success/error message or render confirmation template.
     """
-    item = get_object_or_404(Item, pk=pk)
+    item = get_object_or_404(Item, pk=pk, wishlist__deleted_at__isnull=True)
 
     if item.wishlist.user == request.user:
         messages.error(request, "You cannot reserve your own gifts.")
@@ -344,7 +468,7 @@ def cancel_reservation(request, pk):
     Returns:
         HttpResponse: Redirect to public item detail with success/error message or render confirmation template.
     """
-    item = get_object_or_404(Item, pk=pk)
+    item = get_object_or_404(Item, pk=pk, wishlist__deleted_at__isnull=True)
 
     if request.method == "POST":
         try:
@@ -356,17 +480,52 @@ def cancel_reservation(request, pk):
 
     return render(request, 'wishlist/item_confirm_cancel.html', {'item': item})
 
+@login_required
+def reserved_gifts(request):
+    """
+    Render the gifts reserved by the logged-in user, grouped by wishlist owner,
+    with the number of gifts and total spend per owner.
+    Everything comes from one query on the indexed Item.reserved_by column,
+    joined to the wishlists and owners with select_related; the grouping and
+    sums are done over those rows.
+    Returns:
+        HttpResponse: Rendered template with the reservations grouped by owner.
+    """
+    items = (
+        Item.objects.filter(reserved_by=request.user, wishlist__deleted_at__isnull=True)
+        .select_related('wishlist__user')
+        .order_by('wishlist__user__username', 'wishlist__user_id', 'wishlist__name', 'rank', 'pk')
+    )
+    groups = []
+    for owner, owner_items in groupby(items, key=lambda item: item.wishlist.user):
+        owner_items = list(owner_items)
+        groups.append({
+            'owner': owner,
+            'items': owner_items,
+            'count': len(owner_items),
+            'spend': sum(item.price for item in owner_items if item.price is not None),
+        })
+    return render(request, 'wishlist/reserved_gifts.html', {
+        'groups': groups,
+        'total_count': sum(group['count'] for group in groups),
+        'total_spend': sum(group['spend'] for group in groups),
+    })
+
 @login_required
 def friends_wishlists(request):
     """
-    Render a list of wishlists shared with the logged-in user by friends.
+    Render the wishlists shared with the logged-in user, most recently active first.
+    Reads the materialized FriendFeedEntry rows, which carry item counts and
+    the number of items added since the user's last visit.
     Returns:
-        HttpResponse: Rendered template with friends' wishlists.
+        HttpResponse: Rendered template with the user's feed entries.
     """
-    wishlists = Wishlist.objects.filter(
-        shares__shared_with=request.user
-    ).distinct()  
-    return render(request, 'wishlist/friends_wishlists.html', {'wishlists': wishlists})
+    entries = (
+        FriendFeedEntry.objects.filter(user=request.user, wishlist__deleted_at__isnull=True)
+        .select_related('wishlist__user')
+        .order_by('-last_activity_at')
+    )
+    return render(request, 'wishlist/friends_wishlists.html', {'entries': entries})
 
 
 @login_required
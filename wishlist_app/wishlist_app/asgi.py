@@ -2,6 +2,9 @@
 ASGI config for wishlist_app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Static files are not served here: the front-end proxy serves STATIC_ROOT at
+STATIC_URL (WhiteNoise is sync-only, see wishlist_app.static). With DEBUG on,
+Django's async static files handler serves them for local development.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -9,8 +12,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wishlist_app.settings')
 
 application = get_asgi_application()
+
+if settings.DEBUG:
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+
+    application = ASGIStaticFilesHandler(application)
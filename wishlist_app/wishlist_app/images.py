@@ -0,0 +1,82 @@
+import io
+from pathlib import PurePath
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+# Output format: WebP where Pillow was built with it, otherwise JPEG (PNG for
+# images with transparency).
+_WEBP = features.check('webp')
+
+
+def _output_format(image):
+    if _WEBP:
+        return 'WEBP', 'webp'
+    if image.mode in ('RGBA', 'LA'):
+        return 'PNG', 'png'
+    return 'JPEG', 'jpg'
+
+
+def normalize_image(source, name='image'):
+    """
+    Decode, downscale and re-encode an uploaded or downloaded image.
+
+    JPEGs are decoded with draft() straight at the nearest 1/2, 1/4 or 1/8
+    scale, and other formats are shrunk with reduce() via thumbnail(), so a
+    large photo never gets decoded at full size. The result fits in
+    IMAGE_MAX_DIMENSION pixels, is rotated according to its EXIF orientation
+    and then saved without any metadata (EXIF, GPS, ICC, comments).
+    Args:
+        source (bytes | file): Image data or a file-like object.
+        name (str): Original file name; only the stem is kept.
+    Returns:
+        ContentFile: Re-encoded image named ``<stem>.<ext>`` for the new format.
+    Raises:
+        ValidationError: If the data is not an image or has too many pixels.
+    """
+    max_size = settings.IMAGE_MAX_DIMENSION
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    elif hasattr(source, 'seek'):
+        source.seek(0)
+
+    try:
+        with Image.open(source) as image:
+            if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+                raise ValidationError("The image is too large.")
+            image.draft('RGB', (max_size, max_size))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+            has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+            file_format, extension = _output_format(image)
+            output = io.BytesIO()
+            image.save(output, file_format, quality=settings.IMAGE_QUALITY, optimize=True)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ValidationError("Upload a valid image.") from e
+
+    stem = PurePath(name).stem or 'image'
+    return ContentFile(output.getvalue(), name=f"{stem}.{extension}")
+
+
+class NormalizedImagesMixin:
+    """
+    ModelForm mixin that runs newly uploaded files of the fields listed in
+    ``normalized_image_fields`` through normalize_image().
+    """
+    normalized_image_fields = ()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field in self.normalized_image_fields:
+            upload = cleaned_data.get(field)
+            # Unchanged images are FieldFiles of the instance; only new uploads are normalized.
+            if upload and hasattr(upload, 'content_type'):
+                try:
+                    cleaned_data[field] = normalize_image(upload, upload.name)
+                except ValidationError as e:
+                    self.add_error(field, e)
+        return cleaned_data
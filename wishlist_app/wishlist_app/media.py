@@ -0,0 +1,137 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from accounts.models import UserProfile
+from wishlist.models import Item, Wishlist
+
+# (model, file field, extra filters, needs login) for every kind of media file.
+MEDIA_RULES = [
+    (Item, 'image', {'wishlist__deleted_at__isnull': True}, False),
+    (Wishlist, 'image', {}, False),
+    (UserProfile, 'profile_pic', {}, True),
+]
+
+# Files renamed to a UUID or content hash on upload never change in place.
+IMMUTABLE_NAME_RE = re.compile(r'(^|/)[0-9a-f]{32}(\.[^/]+)?$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+ONE_YEAR = 365 * 24 * 60 * 60
+
+
+def _rule_for(name):
+    """Return whether the file needs a logged-in user, or None if no live row references it."""
+    for model, field, filters, needs_login in MEDIA_RULES:
+        if model.objects.filter(**{field: name}, **filters).exists():
+            return needs_login
+    return None
+
+
+def _byte_range(header, size):
+    """
+    Parse a single-range Range header.
+    Returns:
+        tuple | None: (start, end) inclusive, None to send the whole file.
+    Raises:
+        ValueError: If the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start == '':
+        start, end = max(0, size - int(end)), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def serve_media(request, name):
+    """
+    Serve a file from MEDIA_ROOT after checking that a live row references it.
+
+    Item and wishlist images of soft-deleted wishlists and unreferenced files
+    are 404; profile pictures need a logged-in user. With MEDIA_ACCEL set to
+    'nginx' (X-Accel-Redirect to MEDIA_ACCEL_PREFIX) or 'sendfile' (X-Sendfile)
+    the front-end server sends the bytes and handles ranges; otherwise the
+    file is streamed from here, with single Range requests supported.
+    UUID-named files are cached for a year as immutable.
+    Args:
+        name (str): Path of the file relative to MEDIA_ROOT.
+    """
+    name = os.path.normpath(name).replace(os.sep, '/')
+    if name.startswith(('../', '/')) or name == '..':
+        raise Http404
+    needs_login = _rule_for(name)
+    if needs_login is None or (needs_login and not request.user.is_authenticated):
+        raise Http404
+
+    path = default_storage.path(name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        response = HttpResponseNotModified()
+    elif settings.MEDIA_ACCEL == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+    elif settings.MEDIA_ACCEL == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = _file_response(request, path, stat.st_size, content_type)
+
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if IMMUTABLE_NAME_RE.search(name):
+        patch_cache_control(response, max_age=ONE_YEAR, immutable=True)
+    else:
+        patch_cache_control(response, max_age=60 * 60)
+    if needs_login:
+        patch_cache_control(response, private=True)
+    else:
+        patch_cache_control(response, public=True)
+    return response
+
+
+def _file_response(request, path, size, content_type):
+    try:
+        byte_range = _byte_range(request.headers.get('Range'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+        return response
+
+    f = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(f, content_type=content_type)
+    else:
+        start, end = byte_range
+        f.seek(start)
+        length = end - start + 1
+        response = FileResponse(_read_range(f, length), status=206, content_type=content_type)
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _read_range(f, length, chunk_size=64 * 1024):
+    with f:
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
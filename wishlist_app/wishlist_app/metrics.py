@@ -0,0 +1,238 @@
+import bisect
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_current_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Time spent in each part of a single sampled request.
+    Attributes:
+        db_count (int): Number of SQL queries.
+        db_time, template_time, http_time (float): Seconds spent.
+    """
+    def __init__(self):
+        self.db_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.http_time = 0.0
+
+
+class Histogram:
+    """
+    Minimal thread-safe Prometheus histogram with one label ('view').
+    """
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, value):
+        with self._lock:
+            series = self._series.get(view)
+            if series is None:
+                series = self._series[view] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for view, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['counts']):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{view="{view}",le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{view="{view}"}} {series["sum"]:.6f}')
+                lines.append(f'{self.name}_count{{view="{view}"}} {series["count"]}')
+        return "\n".join(lines)
+
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Wall time of sampled requests per view.')
+DB_QUERIES = Histogram('db_queries_per_request', 'SQL queries per sampled request.', QUERY_COUNT_BUCKETS)
+DB_DURATION = Histogram('db_duration_seconds', 'Time spent in SQL per sampled request.')
+TEMPLATE_DURATION = Histogram('template_render_seconds', 'Template render time per sampled request.')
+HTTP_OUTBOUND_DURATION = Histogram('http_outbound_seconds', 'Outbound HTTP time per sampled request.')
+
+HISTOGRAMS = [REQUEST_DURATION, DB_QUERIES, DB_DURATION, TEMPLATE_DURATION, HTTP_OUTBOUND_DURATION]
+
+
+def _db_execute_wrapper(execute, sql, params, many, context):
+    timings = _current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_time += time.perf_counter() - started
+        timings.db_count += 1
+
+
+def _install_db_wrapper(sender=None, connection=None, **kwargs):
+    if _db_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_execute_wrapper)
+
+
+def _install_db_wrappers():
+    """Make sure connections opened before this module was imported are timed too."""
+    for connection in connections.all(initialized_only=True):
+        _install_db_wrapper(connection=connection)
+
+
+connection_created.connect(_install_db_wrapper, dispatch_uid='wishlist_app.metrics.db_wrapper')
+
+
+@contextmanager
+def record_http():
+    """
+    Count the enclosed block as outbound HTTP time of the current request.
+
+    Usage:
+        with record_http():
+            requests.get(url)
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.http_time += time.perf_counter() - started
+
+
+class TimedTemplate:
+    """Wrap a backend template to record its render time."""
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timings = _current_timings.get()
+            if timings is not None:
+                timings.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates report render time to the metrics middleware."""
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class PerformanceMetricsMiddleware:
+    """
+    Record wall time, SQL count/time, template render time and outbound HTTP
+    time of a sample of requests.
+
+    Sampled responses get a ``Server-Timing`` header, and the numbers are
+    aggregated per view into histograms exposed by ``metrics_view``. The
+    fraction of sampled requests is ``settings.METRICS_SAMPLE_RATE``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        _install_db_wrappers()
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        return self.finish(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        _install_db_wrappers()
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        return self.finish(request, response, timings, time.perf_counter() - started)
+
+    @staticmethod
+    def sampled():
+        rate = getattr(settings, 'METRICS_SAMPLE_RATE', 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+    def finish(self, request, response, timings, elapsed):
+        resolver_match = getattr(request, 'resolver_match', None)
+        view = resolver_match.view_name if resolver_match else 'unresolved'
+        if view == 'metrics':
+            return response
+
+        REQUEST_DURATION.observe(view, elapsed)
+        DB_QUERIES.observe(view, timings.db_count)
+        DB_DURATION.observe(view, timings.db_time)
+        TEMPLATE_DURATION.observe(view, timings.template_time)
+        HTTP_OUTBOUND_DURATION.observe(view, timings.http_time)
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={elapsed * 1000:.1f}',
+            f'db;desc="{timings.db_count} queries";dur={timings.db_time * 1000:.1f}',
+            f'template;dur={timings.template_time * 1000:.1f}',
+            f'http;dur={timings.http_time * 1000:.1f}',
+        ])
+        return response
+
+
+def metrics_view(request):
+    """
+    Expose the collected histograms in the Prometheus text format.
+    Only clients from ``settings.METRICS_ALLOWED_IPS`` may read them.
+    Numbers are per worker process.
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    body = "\n".join(histogram.render() for histogram in HISTOGRAMS) + "\n"
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
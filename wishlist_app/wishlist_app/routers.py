@@ -0,0 +1,119 @@
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PIN_COOKIE_NAME = 'db_pin_primary'
+
+_routing_state = ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+    """
+    Per-request routing state.
+    Attributes:
+        pinned (bool): Send reads to the primary database.
+        wrote (bool): A write happened while handling this request.
+    """
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def get_replicas():
+    """Return the list of configured replica aliases."""
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class PrimaryReplicaRouter:
+    """
+    Database router that sends writes to the primary (``default``) database
+    and spreads reads over the aliases listed in ``settings.DATABASE_REPLICAS``.
+
+    Reads stay on the primary when the request is pinned, i.e. when the user
+    wrote something recently (see ``ReplicaPinningMiddleware``) or when the
+    current request already performed a write. Outside of a request
+    (shell, management commands) every query goes to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        state = _routing_state.get()
+        replicas = get_replicas()
+        if state is None or state.pinned or not replicas:
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None:
+            state.pinned = True
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaPinningMiddleware:
+    """
+    Give users read-your-writes consistency when replicas are in use.
+
+    Unsafe requests (POST, PUT, ...) and requests that write to the database
+    set a short-lived cookie; while it is present, all reads of that user go
+    to the primary so they never see stale data after their own action.
+    The window is ``settings.REPLICA_PIN_SECONDS``.
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _routing_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        return self.finish(request, response, state)
+
+    def start(self, request):
+        pinned = (
+            request.method not in self.SAFE_METHODS
+            or PIN_COOKIE_NAME in request.COOKIES
+        )
+        return RoutingState(pinned=pinned)
+
+    def finish(self, request, response, state):
+        if state.wrote or request.method not in self.SAFE_METHODS:
+            pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+            response.set_cookie(
+                PIN_COOKIE_NAME,
+                str(int(time.time())),
+                max_age=pin_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -1,4 +1,4 @@
-from decouple import config
+from decouple import config, Csv
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -29,7 +29,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'wishlist_app.metrics.PerformanceMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'wishlist_app.routers.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -42,7 +44,7 @@ ROOT_URLCONF = 'wishlist_app.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'wishlist_app.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -57,6 +59,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'wishlist_app.wsgi.application'
 
+# Performance metrics: fraction of requests timed by PerformanceMetricsMiddleware
+# and clients allowed to read /metrics.
+METRICS_SAMPLE_RATE = config('METRICS_SAMPLE_RATE', default=1.0, cast=float)
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1', cast=Csv())
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -76,6 +83,25 @@ DATABASES = {
     }
 }
 
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica1.local,replica2.local:5433
+# Reads are spread over them by wishlist_app.routers.PrimaryReplicaRouter,
+# except for a short window after the user's own writes.
+
+for index, replica_host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    host, _, port = replica_host.partition(':')
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {
+            'MIRROR': 'default',
+        }
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['wishlist_app.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -97,6 +123,22 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+# Loads request.user with select_related('userprofile'). ModelBackend stays
+# listed so sessions created before ProfileModelBackend remain valid.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.ProfileModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Shared cache (e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache,
+# CACHE_LOCATION=redis://localhost:6379). Defaults to a per-process memory cache.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -119,8 +161,36 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# collectstatic writes content-hashed names, .gz/.br copies of text assets and
+# optimized images; WhiteNoise serves them with far-future cache headers and
+# the best encoding the browser accepts. It wraps the WSGI application
+# (wishlist_app.wsgi) instead of being in MIDDLEWARE, which must stay
+# async-capable for ASGI; behind ASGI the proxy serves STATIC_ROOT.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "wishlist_app.storage.OptimizedStaticFilesStorage"},
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Media goes through wishlist_app.media.serve_media for permission checks.
+# 'nginx' hands the transfer to nginx with X-Accel-Redirect (an internal
+# location at MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT), 'sendfile' uses
+# X-Sendfile (Apache/lighttpd); empty streams the file from Django.
+MEDIA_ACCEL = config('MEDIA_ACCEL', default='')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+
+# Uploaded and scraped images are re-encoded on ingest (see wishlist_app.images).
+IMAGE_MAX_DIMENSION = 1600
+IMAGE_MAX_PIXELS = 50_000_000
+IMAGE_QUALITY = 82
+
+# 'lazy' stores only the scraped image URL and serves it through the
+# wishlist:item_image proxy; 'eager' downloads it when the item is saved.
+SCRAPE_IMAGE_MODE = config('SCRAPE_IMAGE_MODE', default='lazy')
+IMAGE_PROXY_CACHE_DIR = config('IMAGE_PROXY_CACHE_DIR', default=str(BASE_DIR / 'image_cache'))
+IMAGE_PROXY_CACHE_MAX_BYTES = config('IMAGE_PROXY_CACHE_MAX_BYTES', default=512 * 1024 * 1024, cast=int)
+IMAGE_PROXY_MAX_DOWNLOAD_BYTES = 15 * 1024 * 1024
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -134,8 +204,72 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')  
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 
+# Outbound scraping limits per shop host (see wishlist.throttling.HostGuard).
+# State lives in the cache, so it is shared between workers when CACHES is.
+SCRAPE_BREAKER_FAILURES = 3
+SCRAPE_BREAKER_WINDOW = 60
+SCRAPE_BREAKER_OPEN_SECONDS = 60
+SCRAPE_HOST_CONCURRENCY = 4
+SCRAPE_HOST_RATE = 2.0
+SCRAPE_HOST_BURST = 5
+SCRAPE_SLOT_TTL = 60
+
+# Known wishlist views are cached so repeat views skip the write (see wishlist.shares.ShareRecorder).
+SHARE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Live wishlist updates over SSE (see wishlist.live). Events are relayed
+# through the cache, so all workers must share it for cross-process delivery.
+LIVE_EVENT_TTL = 300
+LIVE_POLL_INTERVAL = 1.0
+LIVE_HEARTBEAT_SECONDS = 15
+LIVE_STREAM_MAX_SECONDS = 300
+LIVE_RETRY_MS = 3000
+
+# Items are ordered by lexicographic rank keys (see wishlist.ranking). A
+# wishlist whose keys grow past this length is queued for
+# `python manage.py rebalance_item_ranks`.
+RANK_MAX_LENGTH = 24
+
+# Friends' birthday reminders (see wishlist.birthdays): the dashboard widget
+# and the daily `python manage.py send_birthday_digests` look this many days ahead.
+BIRTHDAY_REMINDER_DAYS = 7
+BIRTHDAY_DIGEST_BATCH = 500
+BIRTHDAY_WIDGET_CACHE_TIMEOUT = 60 * 60
+# Host used for links in emails sent outside of a request.
+SITE_DOMAIN = config('SITE_DOMAIN', default='localhost:8000')
+
+# Gift suggestions on public wishlists (see wishlist.suggestions): at most
+# this many of the owner's own items and of popular items site-wide, cached
+# per owner for SUGGESTION_CACHE_TIMEOUT seconds.
+SUGGESTION_LIMIT = 6
+SUGGESTION_CACHE_TIMEOUT = 15 * 60
+
+# Price tracking (see wishlist.prices, run `python manage.py track_prices`).
+# Unreserved items on wishlists with activity in the last
+# PRICE_CHECK_ACTIVE_DAYS are re-scraped every PRICE_CHECK_INTERVAL seconds
+# and go first; other items every PRICE_CHECK_IDLE_INTERVAL. Throttled or
+# failed checks are retried after PRICE_CHECK_RETRY.
+PRICE_CHECK_INTERVAL = 60 * 60 * 24
+PRICE_CHECK_IDLE_INTERVAL = 60 * 60 * 24 * 7
+PRICE_CHECK_RETRY = 60 * 30
+PRICE_CHECK_ACTIVE_DAYS = 30
+PRICE_CHECK_BATCH = 100
+
+# Outgoing emails are queued in accounts.OutboxEmail and delivered by
+# `python manage.py send_outbox`.
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = 30
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = 3600
+
 GOOGLE_CLIENT_ID = config("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = config("GOOGLE_CLIENT_SECRET")
+GOOGLE_REDIRECT_URI = config("GOOGLE_REDIRECT_URI", default="http://localhost:8000/accounts/auth/google/")
+GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
+GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
+GOOGLE_JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ["https://accounts.google.com", "accounts.google.com"]
+GOOGLE_JWKS_TTL = 6 * 60 * 60
+GOOGLE_HTTP_TIMEOUT = 5
 
 # INSTAGRAM_CLIENT_ID = config("INSTAGRAM_CLIENT_ID")
 # INSTAGRAM_CLIENT_SECRET = config("INSTAGRAM_CLIENT_SECRET")
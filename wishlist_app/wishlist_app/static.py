@@ -0,0 +1,21 @@
+from whitenoise.base import WhiteNoise
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class StaticFilesWSGI(WhiteNoiseMiddleware):
+    """
+    WhiteNoise around the WSGI application rather than in MIDDLEWARE.
+
+    WhiteNoiseMiddleware is sync-only, so under ASGI Django would run every
+    request (async views and SSE streams included) through a thread to get
+    past it. This wrapper reads the same settings as the middleware (STATIC_*,
+    WHITENOISE_*, immutable headers for hashed names) but only sits in front
+    of the WSGI entry point; under ASGI, STATIC_ROOT is served by the proxy.
+    """
+    def __init__(self, application):
+        super().__init__()
+        self.application = application
+
+    # The WSGI protocol from WhiteNoise itself, not the middleware's request-based one.
+    __call__ = WhiteNoise.__call__
+    serve = staticmethod(WhiteNoise.serve)
@@ -0,0 +1,72 @@
+import io
+import logging
+
+from PIL import Image, UnidentifiedImageError
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+logger = logging.getLogger(__name__)
+
+OPTIMIZABLE_IMAGES = ('.png', '.jpg', '.jpeg', '.webp')
+
+
+def optimize_image_file(path):
+    """
+    Losslessly re-encode a static image in place, dropping metadata.
+    PNGs are re-compressed with optimize, JPEGs made progressive with their
+    original quantization and WebPs re-encoded losslessly. The file is only
+    replaced when the result is smaller.
+    Returns:
+        int: Bytes saved.
+    """
+    with open(path, 'rb') as f:
+        original = f.read()
+    try:
+        with Image.open(io.BytesIO(original)) as image:
+            output = io.BytesIO()
+            if image.format == 'PNG':
+                image.save(output, 'PNG', optimize=True)
+            elif image.format == 'JPEG':
+                image.save(output, 'JPEG', quality='keep', optimize=True, progressive=True)
+            elif image.format == 'WEBP':
+                image.save(output, 'WEBP', lossless=True, quality=100, method=6)
+            else:
+                return 0
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning("Could not optimize %s: %s", path, e)
+        return 0
+
+    optimized = output.getvalue()
+    if len(optimized) >= len(original):
+        return 0
+    with open(path, 'wb') as f:
+        f.write(optimized)
+    return len(original) - len(optimized)
+
+
+class OptimizedStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Static files storage used by collectstatic.
+
+    On top of WhiteNoise's content-hashed names and precompressed .gz/.br
+    copies of text assets, images are optimized after hashing (the hash
+    still identifies the source, and the output is deterministic). Without a
+    manifest (tests, or before collectstatic has run) URLs fall back to the
+    unhashed names instead of raising.
+    """
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        optimized = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run=dry_run, **options):
+            if (not dry_run and hashed_name and processed is True
+                    and name.lower().endswith(OPTIMIZABLE_IMAGES) and hashed_name not in optimized):
+                optimized.add(hashed_name)
+                for path in (self.path(name), self.path(hashed_name)):
+                    optimize_image_file(path)
+            yield name, hashed_name, processed
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
@@ -1,15 +1,15 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from wishlist.views import home
+from wishlist_app.media import serve_media
+from wishlist_app.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("", home, name="home"),
     path("accounts/", include(("accounts.urls", "accounts"), namespace="accounts")),
     path('wishlist/', include('wishlist.urls')),
-]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    path('metrics', metrics_view, name='metrics'),
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:name>", serve_media, name='media'),
+]
\ No newline at end of file
@@ -2,6 +2,7 @@
 WSGI config for wishlist_app project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+Static files are served by WhiteNoise in front of Django (see wishlist_app.static).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
@@ -11,6 +12,8 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from wishlist_app.static import StaticFilesWSGI
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wishlist_app.settings')
 
-application = get_wsgi_application()
+application = StaticFilesWSGI(get_wsgi_application())